@@ -7,9 +7,14 @@ from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
 from sklearn.feature_selection import SelectKBest, f_regression
 from sklearn.decomposition import PCA
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data_processing'))
+from wide_store import load_wide_frame
 
 # 1. Load the wide-format metrics file
-df_wide = pd.read_csv('./company_metrics_wide.csv')
+df_wide = load_wide_frame('./company_metrics_wide.csv')
 
 # Drop only the heron_id column
 if 'heron_id' in df_wide.columns:
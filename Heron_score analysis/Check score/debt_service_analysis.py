@@ -6,17 +6,25 @@ from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score, mean_squared_error
 from sklearn.model_selection import train_test_split
 from sklearn.impute import SimpleImputer
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data_processing'))
+from column_registry import ColumnRegistry
+from wide_store import open_wide_store
 
 # Set style for better visualizations
 plt.style.use('default')
 sns.set_theme()
 
 # Load the data
-df = pd.read_csv('Check score/company_metrics_wide.csv')
+store = open_wide_store('Check score/company_metrics_wide.csv')
 
 # Select relevant columns
-analysis_columns = [col for col in df.columns if 'debt_service_coverage_ratio' in col]
+registry = ColumnRegistry(store.columns)
+analysis_columns = registry.select(metric_label='debt_service_coverage_ratio')
 target_cols = ['predicted_nsf_fees_next_30_days', 'predicted_nsf_fees_next_60_days', 'predicted_nsf_fees_next_90_days']
+df = store.to_frame(analysis_columns + target_cols)
 
 # Analyze each target metric against DSCR columns
 for target_col in target_cols:
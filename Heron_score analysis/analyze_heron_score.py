@@ -2,12 +2,16 @@ import pandas as pd
 import numpy as np
 from scipy import stats
 import os
+import sys
 
 # Get the directory of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
-# Read the company metrics data
-df = pd.read_csv('/Users/parthsrivastava/Heron/company_metrics.csv')
+sys.path.append(os.path.join(script_dir, '..', 'data_processing'))
+from metrics_cache import load_company_metrics_frame
+
+# Read the company metrics data (through the shared columnar cache)
+df = load_company_metrics_frame('/Users/parthsrivastava/Heron/company_metrics.csv')
 
 # Split companies into high and low heron score groups
 high_score_companies = df[df['metric_label'] == 'heron_score'][df['metric_value'] > 500]
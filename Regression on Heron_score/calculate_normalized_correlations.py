@@ -1,8 +1,13 @@
 import pandas as pd
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from wide_store import load_wide_frame
 
 # Load normalized data
-df = pd.read_csv('Regression on Heron_score/company_metrics_wide_normalized.csv')
+df = load_wide_frame('Regression on Heron_score/company_metrics_wide_normalized.csv')
 
 # Drop heron_id column before calculating correlations
 df = df.drop(columns=['heron_id'])
@@ -1,7 +1,12 @@
 import pandas as pd
 import numpy as np
+import os
+import sys
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from column_registry import ColumnRegistry
+
 # ------------------------------------------------------------------
 # Load the raw, wide-format company metrics that you uploaded earlier
 # ------------------------------------------------------------------
@@ -50,25 +55,10 @@ def normalise_columns(frame, cols, *, use_log, scaler_cls):
 # ---------------------------------------------
 # 1. Detect which columns belong to which block
 # ---------------------------------------------
-financial_prefixes = [
-    "annualized_revenue",
-    "balance_average",
-    "balance_minimum",
-    "latest_balance",
-    "inflow_amount",
-    "outflows",
-    "revenue",
-    "tax_payment_amount",
-    "gross_operating_cashflow",
-    "net_operating_cashflow",
-]
-
-fin_cols   = [c for c in df.columns if any(c.startswith(p) for p in financial_prefixes)]
-growth_cols = [c for c in df.columns if c.endswith("_growth_rate")]
-count_cols  = [
-    c for c in df.columns
-    if c.endswith("_count") or c.endswith("_days") or c in ["inflows", "outflows", "tax_payments"]
-]
+registry = ColumnRegistry(df.columns)
+fin_cols    = registry.select(score_block="financial")
+growth_cols = registry.select(score_block="growth")
+count_cols  = registry.select(score_block="count")
 
 # --------------------------------------------------
 # 2. Apply the three different normalisation schemes
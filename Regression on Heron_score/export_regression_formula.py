@@ -2,6 +2,11 @@
 import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from wide_store import load_wide_frame
 
 NORMALIZED_CSV = 'Regression on Heron_score/company_metrics_wide_normalized.csv'
 COEFS_CSV = 'Regression on Heron_score/regression_coefficients.csv'
@@ -10,7 +15,7 @@ EVAL_TXT = 'Regression on Heron_score/regression_evaluation.txt'
 
 def load_data(path):
     """Load normalized data and split features/target."""
-    df = pd.read_csv(path)
+    df = load_wide_frame(path)
     X = df.drop(columns=['heron_id', 'heron_score_latest'])
     y = df['heron_score_latest']
     return X, y
@@ -1,5 +1,11 @@
 import pandas as pd
 import logging
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from metrics_cache import load_company_metrics_frame
+from pivot_kernel import pivot_frame, write_duplicate_report
 
 # Set up logging
 logging.basicConfig(
@@ -8,24 +14,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def prepare_wide_format_data(input_path, output_path):
+def prepare_wide_format_data(input_path, output_path, duplicate_policy='first'):
     """Transform data from long to wide format"""
     logger.info("Loading data from %s", input_path)
-    data = pd.read_csv(input_path)
+    data = load_company_metrics_frame(input_path)
     
     # Create unique feature names by combining metric_label and metric_date_range
-    data['feature_name'] = data['metric_label'] + '_' + data['metric_date_range'].astype(str)
+    data['feature_name'] = data['metric_label'].astype(str) + '_' + data['metric_date_range'].astype(str)
     
     # Pivot the data to wide format
     logger.info("Transforming data to wide format")
-    wide_data = data.pivot(
+    wide_data, duplicate_report = pivot_frame(
+        data,
         index='heron_id',
         columns='feature_name',
-        values='metric_value'
+        values='metric_value',
+        duplicate_policy=duplicate_policy
     )
-    
-    # Reset index to make heron_id a column
-    wide_data = wide_data.reset_index()
+    if duplicate_report['duplicate_cells']:
+        logger.warning("Resolved %d duplicate cells with policy '%s', see %s",
+                       duplicate_report['duplicate_cells'], duplicate_policy,
+                       write_duplicate_report(duplicate_report, output_path))
     
     # Save the wide format data
     logger.info("Saving wide format data to %s", output_path)
@@ -9,6 +9,12 @@ import joblib
 import logging
 import argparse
 import re
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from column_registry import ColumnRegistry
+from wide_store import load_wide_frame, save_wide_frame
 
 # Set up logging
 logging.basicConfig(
@@ -47,7 +53,7 @@ def create_interaction_features(data):
 def load_and_prepare_data(data_path):
     """Load and prepare data for training."""
     logger.info("Loading data from %s", data_path)
-    data = pd.read_csv(data_path)
+    data = load_wide_frame(data_path)
     
     # Handle missing values
     data = data.fillna(0)
@@ -67,52 +73,13 @@ def dynamic_normalize(data):
     - Ratio metrics: MinMax
     - Data quality metrics: MinMax
     """
-    financial_prefixes = [
-        'annualized_revenue', 'balance_average', 'balance_minimum',
-        'latest_balance', 'inflow_amount', 'outflows', 'revenue',
-        'tax_payment_amount', 'gross_operating_cashflow',
-        'net_operating_cashflow', 'cogs', 'opex', 'average_credit_card_spend',
-        'gross_operating_cashflow_profit_and_loss', 'net_operating_cashflow_profit_and_loss',
-        'revenue_profit_and_loss', 'opex_profit_and_loss', 'revenue_monthly_average'
-    ]
-    count_prefixes = [
-        'inflows', 'outflows', 'tax_payments', 'debt_investment_count',
-        'negative_balance_days', 'nsf_days', 'deposit_days',
-        'distinct_mcas_from_inflows', 'distinct_mcas_from_outflows',
-        'atm_withdrawals', 'debt_investors', 'debt_collection', 'merchant_heron_ids'
-    ]
-    growth_prefixes = [
-        'inflow_growth_rate', 'revenue_growth_rate', 'change_in_balance'
-    ]
-    ratio_prefixes = [
-        'debt_service_coverage_ratio', 'has_balance_ratio'
-    ]
-    data_quality_prefixes = [
-        'confidence', 'coverage', 'freshness', 'data_volume', 'date_range',
-        'category_coverage', 'merchant_coverage', 'unconnected_account_ratio',
-        'data_coverage', 'accounts', 'potentially_duplicated_account_pairs'
-    ]
-
-    # Group columns by their type
-    financial_cols = []
-    count_cols = []
-    growth_cols = []
-    ratio_cols = []
-    data_quality_cols = []
-
-    for col in data.columns:
-        if col == 'heron_id' or col == 'heron_score_latest':
-            continue
-        if any(col.startswith(prefix) for prefix in financial_prefixes):
-            financial_cols.append(col)
-        elif any(col.startswith(prefix) for prefix in count_prefixes):
-            count_cols.append(col)
-        elif any(col.startswith(prefix) for prefix in growth_prefixes):
-            growth_cols.append(col)
-        elif any(col.startswith(prefix) for prefix in ratio_prefixes):
-            ratio_cols.append(col)
-        elif any(col.startswith(prefix) for prefix in data_quality_prefixes):
-            data_quality_cols.append(col)
+    # Group columns by their type, using the shared wide-column registry
+    registry = ColumnRegistry(data.columns)
+    excluded = {'heron_id', 'heron_score_latest'}
+    financial_cols, count_cols, growth_cols, ratio_cols, data_quality_cols = (
+        [col for col in registry.select(normalization=normalization) if col not in excluded]
+        for normalization in ('financial', 'count', 'growth', 'ratio', 'data_quality')
+    )
 
     # Process financial metrics
     if financial_cols:
@@ -306,7 +273,7 @@ def main():
     
     # Save normalized data
     normalized_path = 'Regression on Heron_score/company_metrics_wide_normalized.csv'
-    data.to_csv(normalized_path, index=False, float_format='%.9f')
+    save_wide_frame(data, normalized_path, float_format='%.9f')
     logger.info(f"Normalized data saved to {normalized_path}")
     
     # Prepare features and target
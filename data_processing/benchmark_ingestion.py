@@ -0,0 +1,63 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from metrics_schema import read_metrics_csv
+from parallel_csv import get_worker_count, read_csv_parallel
+
+
+def time_call(func, repeat):
+    """Return the best wall-clock time of func over repeat runs, and its last result"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(file_path, worker_counts, repeat=3):
+    """Compare pd.read_csv against the parallel typed reader for several worker counts"""
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    print(f"Benchmarking {file_path} ({size_mb:.1f} MB), best of {repeat} runs")
+
+    baseline, reference = time_call(lambda: pd.read_csv(file_path), repeat)
+    print(f"{'pd.read_csv':<28} {baseline:8.2f}s  {len(reference) / baseline:12,.0f} rows/s  1.00x")
+
+    results = {'pd.read_csv': baseline}
+    for workers in worker_counts:
+        elapsed, df = time_call(lambda: read_metrics_csv(file_path, workers=workers), repeat)
+        if len(df) != len(reference):
+            raise ValueError(f"Row count mismatch with {workers} workers: {len(df)} != {len(reference)}")
+        name = f"read_metrics_csv workers={workers}"
+        results[name] = elapsed
+        print(f"{name:<28} {elapsed:8.2f}s  {len(df) / elapsed:12,.0f} rows/s  {baseline / elapsed:.2f}x")
+
+    # Untyped parallel parse, to separate the parallel speed-up from the dtype savings
+    workers = max(worker_counts)
+    elapsed, _ = time_call(lambda: read_csv_parallel(file_path, workers=workers), repeat)
+    name = f"read_csv_parallel workers={workers}"
+    results[name] = elapsed
+    print(f"{name:<28} {elapsed:8.2f}s  {len(reference) / elapsed:12,.0f} rows/s  {baseline / elapsed:.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel CSV ingestion against pd.read_csv.")
+    parser.add_argument('--input', default='company_metrics.csv', help='Long-format metrics CSV')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='Worker counts to benchmark (default: 1, 2, 4, ... up to all cores)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per configuration (best time is reported)')
+    args = parser.parse_args()
+
+    worker_counts = args.workers
+    if worker_counts is None:
+        cores = get_worker_count()
+        worker_counts = sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+    run_benchmark(args.input, worker_counts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
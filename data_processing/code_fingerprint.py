@@ -0,0 +1,16 @@
+from enum import Enum
+
+
+def code_fingerprint(value) -> str:
+    """Stable description of a value; functions are described by their name, bytecode and constants.
+
+    Used to notice when validation rules or plot draw functions change, so
+    results computed with the old code are not reused.
+    """
+    code = getattr(value, '__code__', value)
+    if hasattr(code, 'co_code'):
+        consts = ','.join(code_fingerprint(const) for const in code.co_consts)
+        return f"{getattr(value, '__qualname__', code.co_name)}:{code.co_code.hex()}:{code.co_names}:({consts})"
+    if isinstance(value, Enum):
+        return value.value
+    return repr(value)
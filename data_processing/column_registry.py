@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_METRICS_PATH = Path(__file__).resolve().parent.parent / 'metrics.csv'
+
+# Normalization classes of the scoring model, checked in order against the
+# wide column name; the first class with a matching prefix wins
+NORMALIZATION_PREFIXES = (
+    ('financial', (
+        'annualized_revenue', 'balance_average', 'balance_minimum',
+        'latest_balance', 'inflow_amount', 'outflows', 'revenue',
+        'tax_payment_amount', 'gross_operating_cashflow',
+        'net_operating_cashflow', 'cogs', 'opex', 'average_credit_card_spend',
+        'gross_operating_cashflow_profit_and_loss', 'net_operating_cashflow_profit_and_loss',
+        'revenue_profit_and_loss', 'opex_profit_and_loss', 'revenue_monthly_average'
+    )),
+    ('count', (
+        'inflows', 'outflows', 'tax_payments', 'debt_investment_count',
+        'negative_balance_days', 'nsf_days', 'deposit_days',
+        'distinct_mcas_from_inflows', 'distinct_mcas_from_outflows',
+        'atm_withdrawals', 'debt_investors', 'debt_collection', 'merchant_heron_ids'
+    )),
+    ('growth', (
+        'inflow_growth_rate', 'revenue_growth_rate', 'change_in_balance'
+    )),
+    ('ratio', (
+        'debt_service_coverage_ratio', 'has_balance_ratio'
+    )),
+    ('data_quality', (
+        'confidence', 'coverage', 'freshness', 'data_volume', 'date_range',
+        'category_coverage', 'merchant_coverage', 'unconnected_account_ratio',
+        'data_coverage', 'accounts', 'potentially_duplicated_account_pairs'
+    )),
+)
+
+# Normalization blocks of calculate_scores.py. Unlike the model classes, each block
+# is matched on its own (by name prefix, suffix or exact name), so a column can
+# belong to several blocks or to none
+SCORE_BLOCKS = {
+    'financial': {'prefixes': (
+        'annualized_revenue', 'balance_average', 'balance_minimum',
+        'latest_balance', 'inflow_amount', 'outflows', 'revenue',
+        'tax_payment_amount', 'gross_operating_cashflow', 'net_operating_cashflow'
+    )},
+    'growth': {'suffixes': ('_growth_rate',)},
+    'count': {'suffixes': ('_count', '_days'), 'names': ('inflows', 'outflows', 'tax_payments')},
+}
+
+# Fields of ColumnInfo that ColumnRegistry indexes for selection
+INDEXED_FIELDS = ('metric_label', 'metric_group', 'date_range', 'unit', 'normalization')
+
+
+@dataclass(frozen=True)
+class ColumnInfo:
+    """Parsed metadata of a single wide column"""
+    position: int
+    name: str
+    metric_label: Optional[str]
+    metric_group: Optional[str]
+    date_range: Optional[str]
+    unit: Optional[str]
+    normalization: Optional[str]
+
+
+def load_metric_definitions(metrics_path=DEFAULT_METRICS_PATH) -> pd.DataFrame:
+    """Load the metric definitions (group, label, description, unit)"""
+    return pd.read_csv(metrics_path)
+
+
+def classify_normalization(column: str) -> Optional[str]:
+    """Return the normalization class of a wide column, or None if it has none"""
+    for normalization, prefixes in NORMALIZATION_PREFIXES:
+        if column.startswith(prefixes):
+            return normalization
+    return None
+
+
+def in_block(column: str, block: dict) -> bool:
+    """Return whether a wide column matches a block of name prefixes, suffixes and exact names"""
+    return (column.startswith(tuple(block.get('prefixes', ())))
+            or column.endswith(tuple(block.get('suffixes', ())))
+            or column in block.get('names', ()))
+
+
+def split_column(column: str, labels) -> tuple:
+    """Split a wide column into (metric_label, date_range) using the longest matching label"""
+    parts = column.split('_')
+    for k in range(len(parts), 0, -1):
+        label = '_'.join(parts[:k])
+        if label in labels:
+            return label, '_'.join(parts[k:]) or None
+    return None, None
+
+
+class ColumnRegistry:
+    """Metadata of every wide column, parsed once and indexed for selection by position"""
+
+    def __init__(self, columns, definitions: pd.DataFrame = None, blocks: dict = SCORE_BLOCKS):
+        if definitions is None:
+            definitions = load_metric_definitions()
+        groups = dict(zip(definitions['metric_label'], definitions['metric_group']))
+        units = dict(zip(definitions['metric_label'], definitions['metric_unit']))
+
+        self.columns: List[ColumnInfo] = []
+        for position, name in enumerate(columns):
+            label, date_range = split_column(name, groups)
+            self.columns.append(ColumnInfo(
+                position=position,
+                name=name,
+                metric_label=label,
+                metric_group=groups.get(label),
+                date_range=date_range,
+                unit=units.get(label),
+                normalization=classify_normalization(name)
+            ))
+        self.by_name: Dict[str, ColumnInfo] = {info.name: info for info in self.columns}
+
+        # field -> value -> sorted column positions
+        self.index: Dict[str, Dict[str, np.ndarray]] = {}
+        for field in INDEXED_FIELDS:
+            positions = {}
+            for info in self.columns:
+                value = getattr(info, field)
+                if value is not None:
+                    positions.setdefault(value, []).append(info.position)
+            self.index[field] = {value: np.array(p, dtype=np.int64) for value, p in positions.items()}
+
+        # Blocks may overlap, so a column can be listed under several of them
+        self.index['score_block'] = {
+            block: np.array([info.position for info in self.columns if in_block(info.name, rules)], dtype=np.int64)
+            for block, rules in blocks.items()
+        }
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, definitions: pd.DataFrame = None) -> 'ColumnRegistry':
+        return cls(df.columns, definitions)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __getitem__(self, name: str) -> ColumnInfo:
+        return self.by_name[name]
+
+    def positions(self, **criteria) -> np.ndarray:
+        """Return the sorted positions of the columns matching all field=value criteria.
+
+        A value may also be a list, matching any of its entries.
+        """
+        result = np.arange(len(self.columns), dtype=np.int64)
+        for field, value in criteria.items():
+            if field not in self.index:
+                raise ValueError(f"Cannot select wide columns by {field}")
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            matches = [self.index[field][v] for v in values if v in self.index[field]]
+            matched = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int64)
+            result = np.intersect1d(result, matched, assume_unique=True)
+        return result
+
+    def names(self, positions) -> List[str]:
+        """Return the column names at the given positions"""
+        return [self.columns[position].name for position in positions]
+
+    def select(self, **criteria) -> List[str]:
+        """Return the names of the columns matching all field=value criteria, in column order"""
+        return self.names(self.positions(**criteria))
@@ -0,0 +1,183 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from metrics_cache import load_company_metrics_frame
+from metrics_schema import VALUE_COLUMN
+
+# Row arrays of MetricPartitions that are placed in shared memory for worker processes
+SHARED_ARRAYS = ('offsets', 'values', 'heron_id_codes', 'date_range_codes')
+
+# Shared partitions (and their memory blocks) attached by each worker process of map_partitions
+_worker_partitions = None
+
+
+@dataclass
+class MetricPartitions:
+    """Metric values grouped into one contiguous block per metric_label.
+
+    Rows keep their file order within a block, so a block holds the same
+    values, in the same order, as filtering the long table on its label.
+    """
+    labels: list                # metric_label of each block, sorted
+    offsets: np.ndarray         # start of each block in the row arrays, plus the total row count
+    values: np.ndarray          # metric values, without missing values
+    heron_id_codes: np.ndarray  # code into heron_ids of each row
+    heron_ids: np.ndarray
+    date_range_codes: np.ndarray  # code into date_ranges of each row
+    date_ranges: np.ndarray
+
+    def __post_init__(self):
+        self.positions = {label: i for i, label in enumerate(self.labels)}
+
+    def __contains__(self, label):
+        return label in self.positions
+
+    def __len__(self):
+        return len(self.labels)
+
+    def bounds(self, label) -> tuple:
+        """Return the (start, stop) rows of a label's block, empty for unknown labels"""
+        position = self.positions.get(label)
+        if position is None:
+            return 0, 0
+        return int(self.offsets[position]), int(self.offsets[position + 1])
+
+    def get_values(self, label) -> np.ndarray:
+        """Return a view of the values of one metric"""
+        start, stop = self.bounds(label)
+        return self.values[start:stop]
+
+    def get_frame(self, label) -> pd.DataFrame:
+        """Return one metric's rows as a long-format DataFrame with a fresh index"""
+        start, stop = self.bounds(label)
+        return pd.DataFrame({
+            'heron_id': self.heron_ids[self.heron_id_codes[start:stop]],
+            'metric_label': np.full(stop - start, label, dtype=object),
+            'metric_date_range': self.date_ranges[self.date_range_codes[start:stop]],
+            VALUE_COLUMN: self.values[start:stop]
+        })
+
+
+def _codes(column: pd.Series) -> tuple:
+    """Return the integer codes and categories of a (categorical) column.
+
+    A missing entry has code -1, which indexes the NaN appended to the categories.
+    """
+    categorical = column.array if isinstance(column.dtype, pd.CategoricalDtype) else pd.Categorical(column)
+    categories = np.append(np.asarray(categorical.categories, dtype=object), np.nan)
+    return np.asarray(categorical.codes), categories
+
+
+def partition_metrics(df: pd.DataFrame) -> MetricPartitions:
+    """Group a long-format metrics frame by metric_label with a single stable sort, dropping missing values"""
+    label_codes, labels = _codes(df['metric_label'])
+    labels = labels[:-1]
+    heron_id_codes, heron_ids = _codes(df['heron_id'])
+    date_range_codes, date_ranges = _codes(df['metric_date_range'])
+    values = df[VALUE_COLUMN].to_numpy()
+
+    # Blocks in sorted label order; labels without values get no block
+    label_order = np.argsort(labels, kind='stable')
+    rank = np.empty(len(labels), dtype=np.int64)
+    rank[label_order] = np.arange(len(labels))
+
+    keep = np.flatnonzero(~np.isnan(values) & (label_codes >= 0))
+    row_ranks = rank[label_codes[keep]]
+    order = keep[np.argsort(row_ranks, kind='stable')]
+    counts = np.bincount(row_ranks, minlength=len(labels))
+    present = counts > 0
+
+    return MetricPartitions(
+        labels=list(labels[label_order][present]),
+        offsets=np.concatenate([[0], np.cumsum(counts[present])]),
+        values=values[order],
+        heron_id_codes=heron_id_codes[order],
+        heron_ids=heron_ids,
+        date_range_codes=date_range_codes[order],
+        date_ranges=date_ranges
+    )
+
+
+def load_metric_partitions(csv_path='company_metrics.csv', cache_root=None) -> MetricPartitions:
+    """Read a long-format metrics CSV once (through the shared columnar cache) and partition it by metric"""
+    return partition_metrics(load_company_metrics_frame(csv_path, cache_root=cache_root))
+
+
+class SharedMetricPartitions:
+    """Copy of a MetricPartitions' row arrays in shared memory, for process pools.
+
+    `handle` is a small picklable description of the blocks that workers
+    pass to attach_metric_partitions instead of receiving the arrays
+    themselves. Use as a context manager; the blocks are freed on exit.
+    """
+
+    def __init__(self, partitions: MetricPartitions):
+        self.blocks = []
+        self.handle = {
+            'labels': partitions.labels,
+            'heron_ids': partitions.heron_ids,
+            'date_ranges': partitions.date_ranges,
+            'arrays': {}
+        }
+        for name in SHARED_ARRAYS:
+            array = getattr(partitions, name)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self.blocks.append(block)
+            self.handle['arrays'][name] = (block.name, array.dtype.str, array.shape)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_metric_partitions(handle: dict) -> tuple:
+    """Map the shared blocks described by a handle; returns the partitions and the blocks to keep open"""
+    blocks, arrays = [], {}
+    for name, (block_name, dtype, shape) in handle['arrays'].items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    partitions = MetricPartitions(labels=handle['labels'], heron_ids=handle['heron_ids'],
+                                  date_ranges=handle['date_ranges'], **arrays)
+    return partitions, blocks
+
+
+def _init_worker(handle):
+    """Attach the shared metric partitions in a worker process"""
+    global _worker_partitions
+    _worker_partitions = attach_metric_partitions(handle)
+
+
+def _run_task(fn, task):
+    partitions, _ = _worker_partitions
+    return fn(task, partitions)
+
+
+def map_partitions(fn, tasks, partitions: MetricPartitions, workers=1) -> list:
+    """Return [fn(task, partitions) for task in tasks], in task order.
+
+    With more than one worker the tasks run in a process pool whose workers
+    map the partitions from shared memory instead of receiving a copy; fn
+    must then be a module-level function. With one worker they run serially
+    in this process.
+    """
+    if workers <= 1:
+        return [fn(task, partitions) for task in tasks]
+    with SharedMetricPartitions(partitions) as shared:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.handle,)) as executor:
+            return list(executor.map(partial(_run_task, fn), tasks))
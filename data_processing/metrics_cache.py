@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metrics_schema import CATEGORICAL_COLUMNS, VALUE_COLUMN, get_value_dtype, read_metrics_csv
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = '.metrics_cache'
+MANIFEST_NAME = 'manifest.json'
+CACHE_FORMAT_VERSION = 2
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Content hashes computed by this process, keyed by (resolved path, size, mtime)
+_source_hashes = {}
+
+
+def file_hash(file_path) -> str:
+    """Return the BLAKE2 content hash of a file, read in large blocks"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_file_hash(file_path) -> str:
+    """Return the file_hash of a source file, hashing it only once per process while its size and mtime are unchanged"""
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _source_hashes:
+        _source_hashes[key] = file_hash(path)
+    return _source_hashes[key]
+
+
+def get_cache_dir(csv_path, cache_root=None) -> Path:
+    """Return the cache directory used for a given CSV file"""
+    csv_path = Path(csv_path).resolve()
+    root = Path(cache_root) if cache_root else csv_path.parent / CACHE_DIR_NAME
+    return root / csv_path.name
+
+
+def _read_manifest(cache_dir: Path):
+    manifest_path = cache_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_cache(csv_path, cache_dir: Path, source_hash: str, workers=None) -> dict:
+    """Parse the CSV once and store every column as a NumPy array on disk.
+
+    The CSV is read with the shared metrics schema, so metric_value is stored
+    as float64. String columns are stored as integer category codes plus a
+    categories array; numeric columns are stored as-is. The manifest is
+    written last so a partially written cache is never picked up. Large
+    files are parsed with `workers` processes (all cores by default).
+    """
+    logger.info(f"Building columnar cache for {csv_path}...")
+    df = read_metrics_csv(csv_path, workers=workers)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = cache_dir / MANIFEST_NAME
+    if manifest_path.exists():
+        manifest_path.unlink()
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            np.save(cache_dir / f'col_{i}.npy', series.to_numpy())
+            columns.append({'name': name, 'kind': 'numeric'})
+        else:
+            categorical = pd.Categorical(series)
+            np.save(cache_dir / f'col_{i}.npy', categorical.codes)
+            np.save(cache_dir / f'col_{i}_categories.npy',
+                    np.asarray(categorical.categories.astype(str), dtype=str))
+            columns.append({'name': name, 'kind': 'category'})
+
+    manifest = {
+        'format_version': CACHE_FORMAT_VERSION,
+        'source': str(Path(csv_path).resolve()),
+        'source_hash': source_hash,
+        'rows': len(df),
+        'columns': columns
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Cached {len(df)} rows x {len(columns)} columns in {cache_dir}")
+    return manifest
+
+
+def _load_from_cache(cache_dir: Path, manifest: dict, usecols=None, float32=False) -> pd.DataFrame:
+    data = {}
+    for i, column in enumerate(manifest['columns']):
+        name = column['name']
+        if usecols is not None and name not in usecols:
+            continue
+        values = np.load(cache_dir / f'col_{i}.npy', mmap_mode='r')
+        if column['kind'] == 'category':
+            categories = np.load(cache_dir / f'col_{i}_categories.npy')
+            categorical = pd.Categorical.from_codes(np.asarray(values), categories=categories)
+            data[name] = categorical if name in CATEGORICAL_COLUMNS else np.asarray(categorical, dtype=object)
+        elif name == VALUE_COLUMN:
+            data[name] = np.asarray(values, dtype=get_value_dtype(float32))
+        else:
+            data[name] = np.asarray(values)
+    return pd.DataFrame(data)
+
+
+def load_company_metrics_frame(csv_path='company_metrics.csv', usecols=None, cache_root=None,
+                               float32=False, workers=None) -> pd.DataFrame:
+    """Load a long-format metrics CSV through the shared columnar cache.
+
+    The CSV is parsed only when no cache exists or when its content hash no
+    longer matches the one recorded in the cache manifest. The frame follows
+    the shared metrics schema: heron_id, metric_label and metric_date_range
+    are categoricals and metric_value is numeric (float32 if requested).
+    When the cache is (re)built, large files are parsed in parallel by
+    `workers` processes. Load the frame once per run and pass it on; repeat
+    loads in the same process reuse the file's hash but still rebuild the
+    frame.
+    """
+    cache_dir = get_cache_dir(csv_path, cache_root)
+    source_hash = source_file_hash(csv_path)
+
+    manifest = _read_manifest(cache_dir)
+    if (manifest is None
+            or manifest.get('format_version') != CACHE_FORMAT_VERSION
+            or manifest.get('source_hash') != source_hash):
+        manifest = build_cache(csv_path, cache_dir, source_hash, workers)
+    else:
+        logger.info(f"Loading {csv_path} from columnar cache {cache_dir}")
+
+    return _load_from_cache(cache_dir, manifest, usecols, float32)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from parallel_csv import read_csv_parallel
+
+# Key columns of the long-format metrics table, stored as categoricals
+CATEGORICAL_COLUMNS = ('heron_id', 'metric_label', 'metric_date_range')
+
+# Value column, coerced to a numeric dtype (non-numeric entries become NaN)
+VALUE_COLUMN = 'metric_value'
+VALUE_DTYPE = np.float64
+COMPACT_VALUE_DTYPE = np.float32
+
+
+def get_value_dtype(float32: bool = False):
+    """Return the metric_value dtype for the requested precision"""
+    return COMPACT_VALUE_DTYPE if float32 else VALUE_DTYPE
+
+
+def get_read_dtypes() -> dict:
+    """Return the dtype mapping to pass to pd.read_csv for the long-format metrics table"""
+    return {column: 'category' for column in CATEGORICAL_COLUMNS}
+
+
+def coerce_metric_values(values, float32: bool = False) -> np.ndarray:
+    """Coerce raw metric values to the schema's numeric dtype"""
+    return pd.to_numeric(values, errors='coerce').astype(get_value_dtype(float32))
+
+
+def apply_schema(df: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """Cast a long-format metrics DataFrame to the compact schema, in place"""
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    if VALUE_COLUMN in df.columns:
+        df[VALUE_COLUMN] = coerce_metric_values(df[VALUE_COLUMN], float32)
+    return df
+
+
+def read_metrics_csv(file_path, float32: bool = False, workers=None, **kwargs) -> pd.DataFrame:
+    """Read a long-format metrics CSV directly into the compact schema, parsing large files in parallel"""
+    df = read_csv_parallel(file_path, workers=workers, dtype=get_read_dtypes(), **kwargs)
+    return apply_schema(df, float32)
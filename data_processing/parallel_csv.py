@@ -0,0 +1,88 @@
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+# Files smaller than this are parsed in-process; the pool start-up would dominate
+MIN_PARALLEL_BYTES = 32 * 1024 * 1024
+# Lower bound on the size of a byte range handed to a worker
+MIN_PART_BYTES = 8 * 1024 * 1024
+
+
+def get_worker_count(workers=None) -> int:
+    """Return the number of parsing processes to use (all cores when workers is None)"""
+    return max(1, workers if workers is not None else (os.cpu_count() or 1))
+
+
+def split_line_ranges(file_path, n_parts: int):
+    """Split a CSV into n_parts byte ranges that start and end on line boundaries.
+
+    Returns the header line and a list of (start, end) offsets covering the
+    data rows. Assumes no quoted field spans multiple lines, which holds for
+    the metrics exports.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        bounds = [data_start]
+        for i in range(1, n_parts):
+            target = data_start + (size - data_start) * i // n_parts
+            if target <= bounds[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()
+            offset = f.tell()
+            if bounds[-1] < offset < size:
+                bounds.append(offset)
+    bounds.append(size)
+    return header, list(zip(bounds[:-1], bounds[1:]))
+
+
+def _parse_range(task) -> pd.DataFrame:
+    """Parse one byte range of a CSV, prefixed with its header line"""
+    file_path, header, start, end, read_kwargs = task
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data), **read_kwargs)
+
+
+def _concat_parts(parts) -> pd.DataFrame:
+    """Concatenate parsed parts in order, merging per-part categories into one sorted set"""
+    if len(parts) == 1:
+        return parts[0]
+    data = {}
+    for name in parts[0].columns:
+        columns = [part[name] for part in parts]
+        if all(isinstance(column.dtype, pd.CategoricalDtype) for column in columns):
+            data[name] = union_categoricals(columns, sort_categories=True)
+        else:
+            data[name] = pd.concat(columns, ignore_index=True)
+    return pd.DataFrame(data)
+
+
+def read_csv_parallel(file_path, workers=None, **read_kwargs) -> pd.DataFrame:
+    """Parse a CSV with a process pool, one line-aligned byte range per task.
+
+    The typed parts are concatenated in file order, so the result matches a
+    single pd.read_csv call with the same arguments. Small files and a single
+    worker fall back to pd.read_csv.
+    """
+    workers = get_worker_count(workers)
+    size = os.path.getsize(file_path)
+    if workers == 1 or size < MIN_PARALLEL_BYTES:
+        return pd.read_csv(file_path, **read_kwargs)
+
+    n_parts = max(1, min(workers * 2, size // MIN_PART_BYTES))
+    header, ranges = split_line_ranges(file_path, n_parts)
+    logger.info(f"Parsing {file_path} in {len(ranges)} parts with {workers} processes...")
+    tasks = [(file_path, header, start, end, read_kwargs) for start, end in ranges]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(_parse_range, tasks))
+    return _concat_parts(parts)
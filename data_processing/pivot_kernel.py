@@ -0,0 +1,275 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DUPLICATE_POLICIES = ('first', 'last', 'max_freshness', 'mean')
+
+# Cell keys pack (row code, column code) so they stay valid while the matrix grows
+CELL_KEY_SHIFT = 32
+# Key under which all missing (None or NaN) heron_ids or column names share one row or column
+MISSING_KEY = np.nan
+
+
+def freshness_values(values) -> np.ndarray:
+    """Convert a freshness column (numbers or timestamps) to float64, missing values sorting first"""
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series):
+        result = series.to_numpy(dtype=np.float64)
+    else:
+        timestamps = pd.to_datetime(series, errors='coerce', utc=True)
+        result = timestamps.astype('int64').to_numpy(dtype=np.float64)
+        result[timestamps.isna().to_numpy()] = np.nan
+    return np.where(np.isnan(result), -np.inf, result)
+
+
+def sort_keys(keys: np.ndarray) -> np.ndarray:
+    """Return the stable sort order of row or column keys, missing keys first like DataFrame.pivot"""
+    missing = pd.isna(keys)
+    present = np.flatnonzero(~missing)
+    return np.concatenate([np.flatnonzero(missing), present[np.argsort(keys[present], kind='stable')]])
+
+
+def reduce_cells(cells, values, policy='first', freshness=None):
+    """Reduce (cell, value) entries to one value per cell with a stable sort.
+
+    Returns the unique cells, their reduced values, the number of entries per
+    cell, whether the entries of each cell disagree, and the reduced freshness
+    (max_freshness only). Ties keep file order: first takes the earliest
+    entry, last and max_freshness the latest.
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate policy '{policy}', expected one of {DUPLICATE_POLICIES}")
+    if policy == 'max_freshness' and freshness is None:
+        raise ValueError("The max_freshness duplicate policy needs a freshness column")
+    if len(cells) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, values[:0], empty, np.empty(0, dtype=bool), None
+
+    if policy == 'max_freshness':
+        order = np.lexsort((freshness, cells))
+    else:
+        order = np.argsort(cells, kind='stable')
+    sorted_cells = cells[order]
+    sorted_values = values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    ends = np.r_[starts[1:], len(sorted_cells)]
+    counts = ends - starts
+
+    if policy == 'first':
+        reduced = sorted_values[starts]
+    elif policy == 'mean':
+        sums = np.add.reduceat(sorted_values.astype(np.float64), starts)
+        reduced = (sums / counts).astype(values.dtype)
+    else:
+        reduced = sorted_values[ends - 1]
+    conflicting = np.maximum.reduceat(sorted_values, starts) != np.minimum.reduceat(sorted_values, starts)
+    reduced_freshness = freshness[order][ends - 1] if policy == 'max_freshness' else None
+    return sorted_cells[starts], reduced, counts, conflicting, reduced_freshness
+
+
+class WideMatrixBuilder:
+    """Growable company x metric matrix filled in place, spilled to a memmap when too large.
+
+    Cells that receive more than one value are resolved with the duplicate
+    policy (first, last, max_freshness or mean), within and across chunks,
+    and recorded for the duplicate report.
+    """
+
+    def __init__(self, dtype=np.float64, max_memory_bytes=1 << 30, spill_dir=None,
+                 initial_rows=1024, initial_cols=256, duplicate_policy='first'):
+        if duplicate_policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy '{duplicate_policy}', expected one of {DUPLICATE_POLICIES}")
+        self.dtype = np.dtype(dtype)
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_dir = spill_dir
+        self.duplicate_policy = duplicate_policy
+        self.spill_paths = {}
+        self.row_codes = {}
+        self.col_codes = {}
+        self.matrix = self._allocate('values', initial_rows, initial_cols, self.dtype)
+        # Freshness of the value kept in each cell, only needed for max_freshness
+        self.freshness = None
+        if duplicate_policy == 'max_freshness':
+            self.freshness = self._allocate('freshness', initial_rows, initial_cols, np.dtype(np.float64))
+        # Entry counts of cells with more than one entry (cells with one entry are implicit)
+        self.cell_counts = {}
+        self.duplicate_rows = 0
+        self.conflicting_keys = set()
+
+    def _allocate(self, name, n_rows, n_cols, dtype):
+        """Allocate a NaN-filled matrix, in RAM or as a memmap file depending on its size"""
+        if n_rows * n_cols * dtype.itemsize <= self.max_memory_bytes:
+            return np.full((n_rows, n_cols), np.nan, dtype=dtype)
+        fd, path = tempfile.mkstemp(prefix=f'wide_{name}_', suffix='.dat', dir=self.spill_dir)
+        os.close(fd)
+        matrix = np.memmap(path, dtype=dtype, mode='w+', shape=(n_rows, n_cols))
+        matrix[:] = np.nan
+        if name not in self.spill_paths:
+            print(f"Wide matrix exceeds {self.max_memory_bytes} bytes, spilling to {path}")
+        self.spill_paths[name] = path
+        return matrix
+
+    def _grow_matrix(self, name, matrix, new_rows, new_cols):
+        old_path = self.spill_paths.get(name)
+        grown = self._allocate(name, new_rows, new_cols, matrix.dtype)
+        used_rows, used_cols = len(self.row_codes), len(self.col_codes)
+        grown[:used_rows, :used_cols] = matrix[:used_rows, :used_cols]
+        if isinstance(matrix, np.memmap) and old_path != self.spill_paths[name]:
+            del matrix
+            os.remove(old_path)
+        return grown
+
+    def _grow(self, n_rows, n_cols):
+        """Grow the matrices geometrically so that they hold at least n_rows x n_cols"""
+        cur_rows, cur_cols = self.matrix.shape
+        if n_rows <= cur_rows and n_cols <= cur_cols:
+            return
+        new_rows = cur_rows if n_rows <= cur_rows else max(n_rows, 2 * cur_rows)
+        new_cols = cur_cols if n_cols <= cur_cols else max(n_cols, 2 * cur_cols)
+        self.matrix = self._grow_matrix('values', self.matrix, new_rows, new_cols)
+        if self.freshness is not None:
+            self.freshness = self._grow_matrix('freshness', self.freshness, new_rows, new_cols)
+
+    @staticmethod
+    def _assign_codes(keys, codes):
+        """Map keys to global codes, assigning new codes in order of first appearance.
+
+        Missing keys are not dropped: they share the code of MISSING_KEY, so
+        their entries land in a row or column of their own.
+        """
+        local_codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, key in enumerate(uniques):
+            mapping[i] = codes.setdefault(MISSING_KEY if pd.isna(key) else key, len(codes))
+        return mapping[local_codes]
+
+    def add_chunk(self, heron_ids, column_names, values, freshness=None):
+        """Write a chunk of (heron_id, column, value) entries, resolving duplicate cells.
+
+        Every company and column in the chunk gets a row or column, but
+        missing values are never written into a cell.
+        """
+        rows = self._assign_codes(heron_ids, self.row_codes)
+        cols = self._assign_codes(column_names, self.col_codes)
+        self._grow(len(self.row_codes), len(self.col_codes))
+
+        present = ~np.isnan(values)
+        if freshness is not None:
+            freshness = freshness[present]
+        cells = (rows[present] << CELL_KEY_SHIFT) | cols[present]
+        cells, reduced, counts, conflicting, reduced_freshness = reduce_cells(
+            cells, values[present], self.duplicate_policy, freshness)
+        rows, cols = cells >> CELL_KEY_SHIFT, cells & ((1 << CELL_KEY_SHIFT) - 1)
+
+        existing = self.matrix[rows, cols]
+        filled = ~np.isnan(existing)
+        # Compare with a tolerance so that rounding in running means is not taken for a conflict
+        differs = ~np.isclose(existing, reduced, rtol=4 * np.finfo(self.dtype).eps, atol=0)
+        previous_counts = np.array([self.cell_counts.get(key, 1) for key in cells[filled].tolist()], dtype=np.int64)
+        self._record_duplicates(cells, counts, conflicting, filled, differs, previous_counts)
+
+        write = ~filled
+        if filled.any():
+            if self.duplicate_policy == 'last':
+                write[:] = True
+            elif self.duplicate_policy == 'max_freshness':
+                write |= reduced_freshness >= self.freshness[rows, cols]
+            elif self.duplicate_policy == 'mean':
+                new_counts = counts[filled]
+                merged = ((existing[filled] * previous_counts + reduced[filled] * new_counts)
+                          / (previous_counts + new_counts))
+                reduced = reduced.copy()
+                reduced[filled] = merged
+                write[:] = True
+        self.matrix[rows[write], cols[write]] = reduced[write]
+        if self.freshness is not None:
+            self.freshness[rows[write], cols[write]] = reduced_freshness[write]
+
+    def _record_duplicates(self, cells, counts, conflicting, filled, differs, previous_counts):
+        """Track cells that received more than one entry and whether their values disagree"""
+        totals = counts.copy()
+        totals[filled] += previous_counts
+        duplicated = totals > 1
+        if not duplicated.any():
+            return
+        # Entries beyond the first one of each cell (all entries, if the cell was already filled)
+        self.duplicate_rows += int(np.where(filled, counts, counts - 1).sum())
+        self.cell_counts.update(zip(cells[duplicated].tolist(), totals[duplicated].tolist()))
+        self.conflicting_keys.update(cells[conflicting | (filled & differs)].tolist())
+
+    def duplicate_report(self, max_examples=20) -> dict:
+        """Summarize the duplicate cells seen so far, with the most repeated cells as examples"""
+        heron_ids = list(self.row_codes)
+        column_names = list(self.col_codes)
+        mask = (1 << CELL_KEY_SHIFT) - 1
+        ranked = sorted(self.cell_counts.items(), key=lambda item: (-item[1], item[0]))[:max_examples]
+        return {
+            'policy': self.duplicate_policy,
+            'duplicate_cells': len(self.cell_counts),
+            'duplicate_rows': self.duplicate_rows,
+            'conflicting_cells': len(self.conflicting_keys),
+            'examples': [
+                {
+                    'heron_id': str(heron_ids[key >> CELL_KEY_SHIFT]),
+                    'column': str(column_names[key & mask]),
+                    'entries': count,
+                    'conflicting': key in self.conflicting_keys
+                }
+                for key, count in ranked
+            ]
+        }
+
+    def sorted_view(self):
+        """Return heron_ids, column names and the matrix, sorted like pivot_table output"""
+        heron_ids = np.array(list(self.row_codes), dtype=object)
+        column_names = np.array(list(self.col_codes), dtype=object)
+        row_order = sort_keys(heron_ids)
+        col_order = sort_keys(column_names)
+        used = self.matrix[:len(heron_ids), :len(column_names)]
+        return heron_ids[row_order], column_names[col_order], used, row_order, col_order
+
+    def close(self):
+        """Release the matrices and remove any spill files"""
+        self.matrix = None
+        self.freshness = None
+        for path in self.spill_paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+        self.spill_paths = {}
+
+
+def pivot_frame(df, index='heron_id', columns='metric_key', values='metric_value',
+                duplicate_policy='first', freshness_column=None):
+    """Pivot a long DataFrame to a wide one (index as the first column) and report duplicates.
+
+    Unlike DataFrame.pivot, duplicate (index, column) pairs are resolved with
+    the duplicate policy instead of raising.
+    """
+    builder = WideMatrixBuilder(dtype=np.float64, max_memory_bytes=np.iinfo(np.int64).max,
+                                duplicate_policy=duplicate_policy)
+    freshness = freshness_values(df[freshness_column]) if freshness_column else None
+    builder.add_chunk(df[index].to_numpy(dtype=object), df[columns].to_numpy(dtype=object),
+                      pd.to_numeric(df[values], errors='coerce').to_numpy(dtype=np.float64), freshness)
+    heron_ids, column_names, matrix, row_order, col_order = builder.sorted_view()
+    wide = pd.DataFrame(matrix[row_order][:, col_order], columns=column_names)
+    wide.insert(0, index, heron_ids)
+    report = builder.duplicate_report()
+    builder.close()
+    return wide, report
+
+
+def get_duplicate_report_path(wide_file):
+    """Return the duplicate report path that sits next to a wide table"""
+    root, _ = os.path.splitext(wide_file)
+    return f"{root}.duplicates.json"
+
+
+def write_duplicate_report(report, wide_file) -> str:
+    """Write the duplicate report next to the wide table and return its path"""
+    report_file = get_duplicate_report_path(wide_file)
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report_file
@@ -0,0 +1,33 @@
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from transform_metrics import transform_metrics_to_wide, update_wide_incremental
+
+
+def write_long(path, rows):
+    pd.DataFrame(rows, columns=['heron_id', 'metric_label', 'metric_date_range', 'metric_value']).to_csv(
+        path, index=False)
+
+
+def test_incremental_update_with_numeric_heron_ids(tmp_path):
+    long_file, delta_file, wide_file = tmp_path / 'long.csv', tmp_path / 'delta.csv', tmp_path / 'wide.csv'
+    write_long(long_file, [[1, 'revenue', 'last_30_days', 1.0],
+                           [2, 'revenue', 'last_30_days', 2.0],
+                           [3, 'revenue', 'last_30_days', 3.0]])
+    write_long(delta_file, [[2, 'revenue', 'last_30_days', 20.0],
+                            [4, 'revenue', 'last_30_days', 40.0]])
+    transform_metrics_to_wide(str(long_file), str(wide_file))
+
+    manifest = update_wide_incremental(str(delta_file), str(wide_file))
+
+    wide = pd.read_csv(wide_file, dtype={'heron_id': str})
+    assert wide['heron_id'].tolist() == ['1', '2', '3', '4']
+    assert wide['revenue_last_30_days'].tolist() == [1.0, 20.0, 3.0, 40.0]
+    assert manifest['new_companies'] == ['4']
+    assert manifest['changed_companies'] == ['2', '4']
+    with open(tmp_path / 'wide.changes.json') as f:
+        assert json.load(f)['cells_changed'] == 2
@@ -1,31 +1,181 @@
 import pandas as pd
+import numpy as np
+import argparse
+import json
 import os
+from datetime import datetime
+from metrics_cache import file_hash
+from metrics_schema import coerce_metric_values, get_read_dtypes
+from pivot_kernel import DUPLICATE_POLICIES, WideMatrixBuilder, freshness_values, write_duplicate_report
+from wide_store import get_store_dir, save_wide_frame, source_signature, write_wide_store
 
-def transform_metrics_to_wide():
-    # Read the validated metrics file
-    input_file = 'validation_system/validation_results/company_metrics_validated.csv'
-    output_file = 'data/company_metrics_wide.csv'
-    
-    # Read the CSV file
-    print("Reading the metrics file...")
-    df = pd.read_csv(input_file)
-    
-    # Combine metric_label and metric_date_range for unique columns
-    df['metric_label_date'] = df['metric_label'].astype(str) + '_' + df['metric_date_range'].astype(str)
-    
-    # Transform from long to wide format, handling duplicates by taking the first value
-    print("Transforming to wide format...")
-    df_wide = df.pivot_table(
-        index='heron_id',
-        columns='metric_label_date',
-        values='metric_value',
-        aggfunc='first'  # Take the first value if duplicates exist
-    ).reset_index()
-    
-    # Save the transformed data
-    print("Saving the transformed data...")
-    df_wide.to_csv(output_file, index=False)
+PIVOT_COLUMNS = ['heron_id', 'metric_label', 'metric_date_range', 'metric_value']
+
+def stream_pivot_to_wide(input_file, chunk_size=500000, dtype=np.float64,
+                         max_memory_bytes=1 << 30, spill_dir=None,
+                         duplicate_policy='first', freshness_column=None):
+    """Stream a long-format metrics CSV into a WideMatrixBuilder, reading only the pivot columns"""
+    builder = WideMatrixBuilder(dtype=dtype, max_memory_bytes=max_memory_bytes, spill_dir=spill_dir,
+                                duplicate_policy=duplicate_policy)
+    usecols = PIVOT_COLUMNS + ([freshness_column] if freshness_column else [])
+    for chunk in pd.read_csv(input_file, usecols=usecols, dtype=get_read_dtypes(), chunksize=chunk_size):
+        values = coerce_metric_values(chunk['metric_value']).to_numpy()
+        keep = ~np.isnan(values) & chunk['heron_id'].notna().to_numpy()
+        if not keep.any():
+            continue
+        chunk = chunk[keep]
+        # Combine metric_label and metric_date_range for unique columns
+        column_names = chunk['metric_label'].astype(str) + '_' + chunk['metric_date_range'].astype(str)
+        freshness = freshness_values(chunk[freshness_column]) if freshness_column else None
+        builder.add_chunk(chunk['heron_id'].to_numpy(dtype=object), column_names.to_numpy(dtype=object),
+                          values[keep].astype(builder.dtype), freshness)
+    return builder
+
+def log_duplicate_report(report, wide_file):
+    """Print a one-line duplicate summary and save the full report next to the wide table"""
+    report_file = write_duplicate_report(report, wide_file)
+    print(f"Resolved {report['duplicate_cells']} duplicate cells ({report['duplicate_rows']} extra rows, "
+          f"{report['conflicting_cells']} conflicting) with policy '{report['policy']}'; report saved to {report_file}")
+
+def write_wide_csv(builder, output_file, block_rows=10000):
+    """Write the wide matrix to CSV in row blocks, heron_id first"""
+    heron_ids, column_names, matrix, row_order, col_order = builder.sorted_view()
+    for start in range(0, max(len(heron_ids), 1), block_rows):
+        block_rows_idx = row_order[start:start + block_rows]
+        block = pd.DataFrame(matrix[block_rows_idx][:, col_order], columns=column_names)
+        block.insert(0, 'heron_id', heron_ids[start:start + block_rows])
+        block.to_csv(output_file, index=False, mode='w' if start == 0 else 'a', header=start == 0)
+
+def write_builder_store(builder, output_file, block_rows=10000):
+    """Write the wide matrix as the binary store that backs output_file"""
+    heron_ids, column_names, matrix, row_order, col_order = builder.sorted_view()
+    blocks = ((start, matrix[row_order[start:start + block_rows]][:, col_order])
+              for start in range(0, len(heron_ids), block_rows))
+    store_dir = write_wide_store(get_store_dir(output_file), heron_ids, column_names, blocks,
+                                 builder.dtype, source_signature(output_file))
+    print(f"Wide matrix store saved to {store_dir}")
+
+def transform_metrics_to_wide(input_file='validation_system/validation_results/company_metrics_validated.csv',
+                              output_file='data/company_metrics_wide.csv',
+                              chunk_size=500000, dtype=np.float64,
+                              max_memory_bytes=1 << 30, spill_dir=None,
+                              duplicate_policy='first', freshness_column=None):
+    """Transform the validated long-format metrics into the wide company x metric table.
+
+    Values keep full float64 precision; dtype=np.float32 halves the matrix
+    memory, but the written values are then rounded to float32.
+    """
+    # Transform from long to wide format, resolving duplicates with the duplicate policy
+    print("Streaming the metrics file into the wide matrix...")
+    builder = stream_pivot_to_wide(input_file, chunk_size=chunk_size, dtype=dtype,
+                                   max_memory_bytes=max_memory_bytes, spill_dir=spill_dir,
+                                   duplicate_policy=duplicate_policy, freshness_column=freshness_column)
+    try:
+        print(f"Built wide matrix with {len(builder.row_codes)} companies x {len(builder.col_codes)} metrics")
+        log_duplicate_report(builder.duplicate_report(), output_file)
+
+        # Save the transformed data
+        print("Saving the transformed data...")
+        write_wide_csv(builder, output_file)
+        write_builder_store(builder, output_file)
+    finally:
+        builder.close()
     print(f"Transformation complete. Output saved to {output_file}")
 
+def get_change_manifest_path(wide_file):
+    """Return the change manifest path that sits next to a wide table"""
+    root, _ = os.path.splitext(wide_file)
+    return f"{root}.changes.json"
+
+def update_wide_incremental(delta_file, wide_file='data/company_metrics_wide.csv',
+                            manifest_file=None, chunk_size=500000,
+                            duplicate_policy='first', freshness_column=None):
+    """Upsert a delta of long-format rows into the existing wide table.
+
+    Only cells present in the delta are overwritten; other values of the
+    affected companies are kept. New companies and new metric/date-range
+    columns are inserted in sorted position. A change manifest listing the
+    changed companies and new columns is written next to the wide table.
+    """
+    print(f"Streaming delta file {delta_file}...")
+    builder = stream_pivot_to_wide(delta_file, chunk_size=chunk_size, dtype=np.float64,
+                                   duplicate_policy=duplicate_policy, freshness_column=freshness_column)
+    try:
+        if builder.duplicate_rows:
+            log_duplicate_report(builder.duplicate_report(), delta_file)
+        heron_ids, column_names, matrix, row_order, col_order = builder.sorted_view()
+        delta = pd.DataFrame(matrix[row_order][:, col_order],
+                             index=pd.Index(heron_ids, name='heron_id'), columns=column_names)
+    finally:
+        builder.close()
+
+    if os.path.exists(wide_file):
+        # Read the CSV text rather than the store so float32 tables keep their written precision;
+        # heron_ids stay strings, like the delta's, so numeric-looking ids still match
+        wide = pd.read_csv(wide_file, index_col='heron_id', dtype={'heron_id': str})
+    else:
+        print(f"{wide_file} does not exist yet, creating it from the delta")
+        wide = pd.DataFrame(index=pd.Index([], name='heron_id', dtype=object))
+
+    delta.index = delta.index.astype(str)
+    new_columns = delta.columns.difference(wide.columns)
+    new_companies = delta.index.difference(wide.index)
+    wide = wide.reindex(index=wide.index.union(delta.index), columns=wide.columns.union(delta.columns))
+
+    # Upsert the delta cells, keeping existing values where the delta has none
+    values = wide.to_numpy(dtype=np.float64, copy=True)
+    rows = wide.index.get_indexer(delta.index)
+    cols = wide.columns.get_indexer(delta.columns)
+    before = values[np.ix_(rows, cols)]
+    delta_values = delta.to_numpy()
+    after = np.where(np.isnan(delta_values), before, delta_values)
+    changed = ~((before == after) | (np.isnan(before) & np.isnan(after)))
+    values[np.ix_(rows, cols)] = after
+    wide = pd.DataFrame(values, index=wide.index, columns=wide.columns)
+    changed_companies = delta.index[changed.any(axis=1)]
+
+    print(f"Updating {len(changed_companies)} companies ({len(new_companies)} new) "
+          f"and adding {len(new_columns)} new columns...")
+    save_wide_frame(wide.reset_index(), wide_file)
+
+    manifest = {
+        'updated_at': datetime.now().isoformat(),
+        'delta_file': str(delta_file),
+        'delta_hash': file_hash(delta_file),
+        'wide_file': str(wide_file),
+        'total_companies': len(wide.index),
+        'total_columns': len(wide.columns),
+        'cells_changed': int(changed.sum()),
+        'new_columns': list(new_columns),
+        'new_companies': list(new_companies),
+        'changed_companies': list(changed_companies)
+    }
+    manifest_file = manifest_file or get_change_manifest_path(wide_file)
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Incremental update complete. Change manifest saved to {manifest_file}")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Transform long-format metrics to the wide company x metric table.")
+    parser.add_argument('--input', default='validation_system/validation_results/company_metrics_validated.csv',
+                        help='Validated long-format metrics CSV (full rebuild)')
+    parser.add_argument('--output', default='data/company_metrics_wide.csv', help='Wide table CSV')
+    parser.add_argument('--delta', help='Long-format CSV of changed rows; upserts them into the existing wide table')
+    parser.add_argument('--manifest', help='Change manifest path for --delta (default: next to the wide table)')
+    parser.add_argument('--duplicate-policy', choices=DUPLICATE_POLICIES, default='first',
+                        help='How to resolve several values for the same company and metric (default: first)')
+    parser.add_argument('--freshness-column', help='Column ranking duplicate values for --duplicate-policy max_freshness')
+    parser.add_argument('--float32', action='store_true',
+                        help='Build the wide matrix in float32 to halve its memory (values lose precision)')
+    args = parser.parse_args()
+
+    if args.delta:
+        update_wide_incremental(args.delta, args.output, args.manifest,
+                                duplicate_policy=args.duplicate_policy, freshness_column=args.freshness_column)
+    else:
+        transform_metrics_to_wide(args.input, args.output, dtype=np.float32 if args.float32 else np.float64,
+                                  duplicate_policy=args.duplicate_policy, freshness_column=args.freshness_column)
+
 if __name__ == "__main__":
-    transform_metrics_to_wide() 
\ No newline at end of file
+    main()
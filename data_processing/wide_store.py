@@ -0,0 +1,201 @@
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metrics_cache import source_file_hash
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR_NAME = '.wide_store'
+MANIFEST_NAME = 'manifest.json'
+MATRIX_NAME = 'matrix.npy'
+HERON_IDS_NAME = 'heron_ids.npy'
+COLUMNS_NAME = 'columns.npy'
+# Version 2: stores hold exactly the values written to the CSV (e.g. rounded by a float_format)
+STORE_FORMAT_VERSION = 2
+ID_COLUMN = 'heron_id'
+
+
+class WideMatrixStore:
+    """Memory-mapped company x metric matrix with heron_id and column indexes.
+
+    The matrix is stored column-major, so column-projected loads read
+    contiguous ranges and the full matrix maps onto a DataFrame without a
+    copy. It is opened copy-on-write: callers may modify the arrays they get
+    back, but changes never reach the file.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        with open(self.store_dir / MANIFEST_NAME) as f:
+            self.manifest = json.load(f)
+        self.heron_ids = np.load(self.store_dir / HERON_IDS_NAME).astype(object)
+        self.columns = np.load(self.store_dir / COLUMNS_NAME).astype(object)
+        self.matrix = np.load(self.store_dir / MATRIX_NAME, mmap_mode='c')
+        self.row_index = {heron_id: i for i, heron_id in enumerate(self.heron_ids)}
+        self.column_index = {column: j for j, column in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.heron_ids)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def column_positions(self, columns) -> np.ndarray:
+        """Return the matrix positions of the given columns, raising KeyError for unknown ones"""
+        missing = [column for column in columns if column not in self.column_index]
+        if missing:
+            raise KeyError(f"Columns not found in wide store: {missing}")
+        return np.array([self.column_index[column] for column in columns], dtype=np.int64)
+
+    def row(self, heron_id, columns=None) -> np.ndarray:
+        """Return the metric values of a single company"""
+        values = self.matrix[self.row_index[heron_id]]
+        return values if columns is None else values[self.column_positions(columns)]
+
+    def get(self, heron_id, column) -> float:
+        """Return a single metric value for a company"""
+        return self.matrix[self.row_index[heron_id], self.column_index[column]]
+
+    def to_numpy(self, columns=None) -> np.ndarray:
+        """Return the matrix, or only the requested columns"""
+        if columns is None:
+            return self.matrix
+        return self.matrix[:, self.column_positions(columns)]
+
+    def to_frame(self, columns=None, include_heron_id=True) -> pd.DataFrame:
+        """Return the matrix as a DataFrame shaped like the wide CSV (heron_id first)"""
+        if columns is None:
+            frame = pd.DataFrame(self.matrix, columns=list(self.columns), copy=False)
+        else:
+            columns = [column for column in columns if column != ID_COLUMN]
+            frame = pd.DataFrame(self.to_numpy(columns), columns=columns, copy=False)
+        if include_heron_id:
+            frame.insert(0, ID_COLUMN, self.heron_ids)
+        return frame
+
+
+def get_store_dir(csv_path, store_root=None) -> Path:
+    """Return the store directory that backs a given wide CSV file"""
+    csv_path = Path(csv_path).resolve()
+    root = Path(store_root) if store_root else csv_path.parent / STORE_DIR_NAME
+    return root / csv_path.name
+
+
+def _read_manifest(store_dir: Path):
+    manifest_path = store_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def source_signature(csv_path) -> dict:
+    """Return the size, mtime and content hash of a wide CSV, as recorded in the store manifest"""
+    stat = Path(csv_path).stat()
+    return {'source_hash': source_file_hash(csv_path), 'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns}
+
+
+def _stat_matches(manifest: dict, csv_path) -> bool:
+    stat = Path(csv_path).stat()
+    return manifest.get('source_size') == stat.st_size and manifest.get('source_mtime_ns') == stat.st_mtime_ns
+
+
+def _write_manifest(store_dir: Path, manifest: dict) -> None:
+    with open(store_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def write_wide_store(store_dir, heron_ids, columns, blocks, dtype=np.float64, source=None) -> Path:
+    """Write a wide matrix store from (start_row, block) pairs covering all rows in order.
+
+    The manifest is written last so a partially written store is never
+    picked up. source is the source_signature of the CSV the store backs.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = store_dir / MANIFEST_NAME
+    if manifest_path.exists():
+        manifest_path.unlink()
+
+    heron_ids = np.asarray(heron_ids, dtype=str)
+    columns = np.asarray(columns, dtype=str)
+    np.save(store_dir / HERON_IDS_NAME, heron_ids)
+    np.save(store_dir / COLUMNS_NAME, columns)
+
+    matrix = np.lib.format.open_memmap(store_dir / MATRIX_NAME, mode='w+', dtype=dtype,
+                                       shape=(len(heron_ids), len(columns)), fortran_order=True)
+    for start, block in blocks:
+        matrix[start:start + len(block)] = block
+    matrix.flush()
+    del matrix
+
+    manifest = {
+        'format_version': STORE_FORMAT_VERSION,
+        **(source or {'source_hash': None}),
+        'rows': len(heron_ids),
+        'columns': len(columns),
+        'dtype': np.dtype(dtype).name
+    }
+    _write_manifest(store_dir, manifest)
+    return store_dir
+
+
+def write_frame_store(df: pd.DataFrame, store_dir, source=None) -> Path:
+    """Write a wide DataFrame (heron_id column plus numeric columns) as a store"""
+    values = df.drop(columns=[ID_COLUMN]).apply(pd.to_numeric, errors='coerce')
+    return write_wide_store(store_dir, df[ID_COLUMN].astype(str).to_numpy(), values.columns,
+                            [(0, values.to_numpy(dtype=np.float64))], np.float64, source)
+
+
+def read_wide_csv(csv_path) -> pd.DataFrame:
+    """Read a wide CSV with the round-trip float parser, so values written with full precision come back exactly"""
+    return pd.read_csv(csv_path, float_precision='round_trip')
+
+
+def save_wide_frame(df: pd.DataFrame, csv_path, **to_csv_kwargs) -> None:
+    """Save a wide DataFrame as CSV and refresh the binary store that backs it.
+
+    When the CSV is written with a float_format, the store is built from the
+    written text, so it holds the same rounded values as a store rebuilt
+    from the CSV.
+    """
+    df.to_csv(csv_path, index=False, **to_csv_kwargs)
+    if to_csv_kwargs.get('float_format') is not None:
+        df = read_wide_csv(csv_path)
+    write_frame_store(df, get_store_dir(csv_path), source_signature(csv_path))
+
+
+def open_wide_store(csv_path, store_root=None) -> WideMatrixStore:
+    """Open the binary store for a wide CSV, building it from the CSV when missing or stale.
+
+    The CSV is only hashed when its size or mtime differ from the manifest;
+    if its content is unchanged, the manifest takes the new size and mtime.
+    """
+    store_dir = get_store_dir(csv_path, store_root)
+    manifest = _read_manifest(store_dir)
+    if manifest is None or manifest.get('format_version') != STORE_FORMAT_VERSION:
+        manifest = None
+    if manifest is not None and _stat_matches(manifest, csv_path):
+        return WideMatrixStore(store_dir)
+
+    source = source_signature(csv_path)
+    if manifest is not None and manifest.get('source_hash') == source['source_hash']:
+        _write_manifest(store_dir, {**manifest, **source})
+    else:
+        logger.info(f"Building wide matrix store for {csv_path}...")
+        write_frame_store(read_wide_csv(csv_path), store_dir, source)
+    return WideMatrixStore(store_dir)
+
+
+def load_wide_frame(csv_path, columns=None, store_root=None) -> pd.DataFrame:
+    """Load a wide CSV through its binary store, optionally projecting to a subset of columns"""
+    return open_wide_store(csv_path, store_root).to_frame(columns)
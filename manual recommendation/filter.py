@@ -1,21 +1,28 @@
 import pandas as pd
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from metrics_cache import load_company_metrics_frame
+from pivot_kernel import pivot_frame, write_duplicate_report
+from wide_store import load_wide_frame, save_wide_frame
 
 def process_company_metrics():
     # Read the company metrics data
     try:
-        df = pd.read_csv('../company_metrics.csv')
+        df = load_company_metrics_frame('../company_metrics.csv')
         
         # Create a unique identifier for each metric by combining label and date range
-        df['metric_key'] = df['metric_label'] + '_' + df['metric_date_range']
+        df['metric_key'] = df['metric_label'].astype(str) + '_' + df['metric_date_range'].astype(str)
         
         # Pivot the data to wide format
-        wide_df = df.pivot(index='heron_id', 
-                          columns='metric_key', 
-                          values='metric_value')
-        
-        # Reset index to make heron_id a column
-        wide_df = wide_df.reset_index()
+        wide_df, duplicate_report = pivot_frame(df, index='heron_id',
+                                                columns='metric_key',
+                                                values='metric_value')
+        if duplicate_report['duplicate_cells']:
+            report_file = write_duplicate_report(duplicate_report, 'company_metrics_wide.csv')
+            print(f"\nKept the first of duplicate values in {duplicate_report['duplicate_cells']} cells, see '{report_file}'")
         
         # Display basic information about the wide format dataset
         print("\nWide Format Dataset Info:")
@@ -36,7 +43,7 @@ def process_company_metrics():
         wide_df[numeric_columns] = wide_df[numeric_columns].fillna(wide_df[numeric_columns].median())
         
         # Save the processed data
-        wide_df.to_csv('company_metrics_wide.csv', index=False)
+        save_wide_frame(wide_df, 'company_metrics_wide.csv')
         print("\nProcessed data saved to 'company_metrics_wide.csv'")
         
         return wide_df
@@ -48,8 +55,6 @@ def process_company_metrics():
 def select_and_save_columns():
     try:
         # Read the wide format company metrics data
-        wide_df = pd.read_csv('company_metrics_wide.csv')
-        
         # Define the exact list of columns requested by the user
         selected_columns = [
             'heron_id',
@@ -82,8 +87,8 @@ def select_and_save_columns():
             'revenue_last_12_calendar_months'
         ]
 
-        # Select the specified columns
-        df_selected = wide_df[selected_columns]
+        # Load only the specified columns from the wide matrix store
+        df_selected = load_wide_frame('company_metrics_wide.csv', columns=selected_columns)
         
         # Save the selected data to a new CSV file
         output_filename = 'company_metrics_specific_columns.csv'
@@ -0,0 +1,55 @@
+import argparse
+import time
+
+import numpy as np
+from scipy.stats import gaussian_kde
+
+from fast_kde import DEFAULT_TOLERANCE, binned_kde
+
+
+def time_call(func, repeat):
+    """Return the best wall-clock time of func over repeat runs, and its last result"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(sizes, grid_size=1000, tolerance=DEFAULT_TOLERANCE, repeat=3, seed=0):
+    """Compare gaussian_kde against binned_kde on skewed samples of several sizes"""
+    print(f"Density on {grid_size} grid points, tolerance {tolerance:g}, best of {repeat} runs")
+    print(f"{'values':>10} {'gaussian_kde':>14} {'binned_kde':>12} {'speed-up':>9} {'max error':>10}")
+    rng = np.random.default_rng(seed)
+    results = {}
+    for n in sizes:
+        # Long right tail like the amount metrics, plus a few extreme values
+        values = np.r_[rng.lognormal(10, 1.5, n - n // 1000), rng.lognormal(16, 1, n // 1000)]
+        grid = np.linspace(values.min(), values.max(), grid_size)
+
+        exact_time, exact = time_call(lambda: gaussian_kde(values)(grid), repeat)
+        fast_time, approx = time_call(lambda: binned_kde(values, grid, tolerance), repeat)
+        error = float(np.max(np.abs(approx - exact)) / np.max(exact))
+        if error > tolerance:
+            raise ValueError(f"binned_kde error {error:.2e} exceeds the tolerance for {n} values")
+        results[n] = (exact_time, fast_time, error)
+        print(f"{n:>10,} {exact_time:>13.3f}s {fast_time:>11.4f}s {exact_time / fast_time:>8.0f}x {error:>10.2e}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the binned FFT KDE against scipy's gaussian_kde.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Numbers of values to estimate the density of')
+    parser.add_argument('--grid', type=int, default=1000, help='Grid points the density is evaluated on')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Largest allowed error relative to the peak density')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per configuration (best time is reported)')
+    args = parser.parse_args()
+
+    run_benchmark(args.sizes, args.grid, args.tolerance, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 import warnings
 import logging
+import sys
 warnings.filterwarnings('ignore')
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from metrics_cache import load_company_metrics_frame
+from plot_renderer import PlotJob, PlotRenderer, prune_plots
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -37,7 +42,7 @@ def load_data():
     
     # Load company metrics data (using full dataset)
     logging.info("Loading company metrics from company_metrics.csv...")
-    company_metrics_df = pd.read_csv('company_metrics.csv')
+    company_metrics_df = load_company_metrics_frame('company_metrics.csv')
     logging.info(f"Loaded {len(company_metrics_df)} metric records")
     
     return metrics_df, company_metrics_df
@@ -57,9 +62,8 @@ def prepare_data(metrics_df, company_metrics_df):
     metric_units = dict(zip(metrics_df['metric_label'], metrics_df['metric_unit']))
     company_metrics_df['metric_unit'] = company_metrics_df['metric_label'].map(metric_units)
     
-    # Filter out non-numeric values
-    logging.info("Converting metric values to numeric and removing non-numeric values...")
-    company_metrics_df['metric_value'] = pd.to_numeric(company_metrics_df['metric_value'], errors='coerce')
+    # Filter out non-numeric values (coerced to NaN by the shared schema)
+    logging.info("Removing non-numeric metric values...")
     original_len = len(company_metrics_df)
     company_metrics_df = company_metrics_df.dropna(subset=['metric_value'])
     logging.info(f"Removed {original_len - len(company_metrics_df)} non-numeric values")
@@ -83,7 +87,7 @@ def pivot_data_for_correlation(df):
         range_df = df[df['metric_date_range'] == date_range]
         
         # Pivot the data to have metrics as columns
-        pivot_df = range_df.pivot_table(index='heron_id', columns='metric_label', values='metric_value')
+        pivot_df = range_df.pivot_table(index='heron_id', columns='metric_label', values='metric_value', observed=True)
         logging.info(f"Created pivot table with {pivot_df.shape[1]} metrics for {date_range}")
         
         # Store for analysis
@@ -91,8 +95,38 @@ def pivot_data_for_correlation(df):
         
     return correlation_data
 
-def analyze_correlations(correlation_data, metrics_df):
-    """Analyze correlations between metrics"""
+def draw_correlation_matrix(fig, matrix, labels, date_range):
+    """Draw the lower triangle of a metric correlation matrix as a heatmap"""
+    ax = fig.subplots()
+    corr_matrix = pd.DataFrame(matrix, index=pd.Index(labels, name='metric_label'),
+                               columns=pd.Index(labels, name='metric_label'))
+    mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
+    sns.heatmap(corr_matrix, mask=mask, cmap='coolwarm', center=0, 
+                square=True, linewidths=.5, annot=False, fmt=".2f", 
+                vmin=-1, vmax=1, ax=ax)
+    ax.set_title(f'Correlation Matrix for Date Range: {date_range}')
+    fig.tight_layout()
+
+def draw_correlation_pair(fig, x, y, metric1, metric2, correlation):
+    """Draw a scatter plot with a regression line of two correlated metrics"""
+    ax = fig.subplots()
+    data = pd.DataFrame({metric1: x, metric2: y})
+    sns.regplot(x=metric1, y=metric2, data=data, scatter_kws={'alpha':0.5}, ax=ax)
+    ax.set_title(f'Correlation between {metric1} and {metric2}\nCorrelation: {correlation:.3f}')
+    fig.tight_layout()
+
+def draw_group_correlation(fig, matrix, groups, date_range):
+    """Draw the average correlation between metric groups as an annotated heatmap"""
+    ax = fig.subplots()
+    group_corr = pd.DataFrame(matrix, index=groups, columns=groups)
+    sns.heatmap(group_corr, cmap='coolwarm', center=0, 
+                square=True, linewidths=.5, annot=True, fmt=".2f",
+                vmin=-1, vmax=1, ax=ax)
+    ax.set_title(f'Average Correlation Between Metric Groups for {date_range}')
+    fig.tight_layout()
+
+def analyze_correlations(correlation_data, metrics_df, renderer):
+    """Analyze correlations between metrics, submitting the plots to the renderer"""
     logging.info("Starting correlation analysis...")
     report_lines = []
     report_lines.append("# Metric Correlation Analysis\n\n")
@@ -117,15 +151,13 @@ def analyze_correlations(correlation_data, metrics_df):
         
         # Plot full correlation matrix
         logging.info("Generating correlation matrix heatmap...")
-        plt.figure(figsize=(16, 14))
-        mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
-        sns.heatmap(corr_matrix, mask=mask, cmap='coolwarm', center=0, 
-                    square=True, linewidths=.5, annot=False, fmt=".2f", 
-                    vmin=-1, vmax=1)
-        plt.title(f'Correlation Matrix for Date Range: {date_range}')
-        plt.tight_layout()
-        plt.savefig(os.path.join(PLOT_DIR, f'correlation_matrix_{date_range}.png'))
-        plt.close()
+        renderer.submit(PlotJob(
+            path=os.path.join(PLOT_DIR, f'correlation_matrix_{date_range}.png'),
+            draw=draw_correlation_matrix,
+            data={'matrix': corr_matrix.to_numpy(dtype=np.float64)},
+            params={'labels': [str(label) for label in corr_matrix.columns], 'date_range': str(date_range)},
+            figsize=(16, 14)
+        ))
         
         # Find strong correlations
         logging.info("Identifying strong correlations...")
@@ -206,12 +238,15 @@ def analyze_correlations(correlation_data, metrics_df):
                         data = pivot_df[[metric1, metric2]].dropna()
                         
                         if len(data) >= 5:  # Ensure we have enough data points
-                            plt.figure(figsize=(10, 6))
-                            sns.regplot(x=metric1, y=metric2, data=data, scatter_kws={'alpha':0.5})
-                            plt.title(f'Correlation between {metric1} and {metric2}\nCorrelation: {row["correlation"]:.3f}')
-                            plt.tight_layout()
-                            plt.savefig(os.path.join(PLOT_DIR, f'correlation_{metric1}_{metric2}_{date_range}.png'))
-                            plt.close()
+                            renderer.submit(PlotJob(
+                                path=os.path.join(PLOT_DIR, f'correlation_{metric1}_{metric2}_{date_range}.png'),
+                                draw=draw_correlation_pair,
+                                data={'x': data[metric1].to_numpy(dtype=np.float64),
+                                      'y': data[metric2].to_numpy(dtype=np.float64)},
+                                params={'metric1': str(metric1), 'metric2': str(metric2),
+                                        'correlation': float(row['correlation'])},
+                                figsize=(10, 6)
+                            ))
             
             report_lines.append("\n")
     
@@ -232,8 +267,8 @@ def analyze_correlations(correlation_data, metrics_df):
     
     return ''.join(report_lines)
 
-def analyze_metric_group_correlations(correlation_data, metrics_df):
-    """Analyze correlations between metric groups"""
+def analyze_metric_group_correlations(correlation_data, metrics_df, renderer):
+    """Analyze correlations between metric groups, submitting the plots to the renderer"""
     logging.info("Starting metric group correlation analysis...")
     report_lines = []
     report_lines.append("\n## Metric Group Correlation Analysis\n\n")
@@ -297,14 +332,13 @@ def analyze_metric_group_correlations(correlation_data, metrics_df):
         
         # Plot group correlation matrix
         logging.info("Generating group correlation heatmap...")
-        plt.figure(figsize=(12, 10))
-        sns.heatmap(group_corr, cmap='coolwarm', center=0, 
-                    square=True, linewidths=.5, annot=True, fmt=".2f",
-                    vmin=-1, vmax=1)
-        plt.title(f'Average Correlation Between Metric Groups for {date_range}')
-        plt.tight_layout()
-        plt.savefig(os.path.join(PLOT_DIR, f'group_correlation_{date_range}.png'))
-        plt.close()
+        renderer.submit(PlotJob(
+            path=os.path.join(PLOT_DIR, f'group_correlation_{date_range}.png'),
+            draw=draw_group_correlation,
+            data={'matrix': group_corr.to_numpy(dtype=np.float64)},
+            params={'groups': [str(group) for group in group_corr.index], 'date_range': str(date_range)},
+            figsize=(12, 10)
+        ))
         
         # Report strong group correlations
         logging.info("Identifying strong group correlations...")
@@ -335,6 +369,11 @@ def generate_correlation_report(correlation_report, group_correlation_report):
 
 def main():
     """Main function to run the correlation analysis"""
+    parser = argparse.ArgumentParser(description="Analyze correlations between metrics.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes used to render plots in parallel (default: 1)')
+    args = parser.parse_args()
+
     logging.info("Starting correlation analysis...")
     
     try:
@@ -347,11 +386,16 @@ def main():
         # Pivot data for correlation analysis
         correlation_data = pivot_data_for_correlation(company_metrics_df)
         
-        # Analyze correlations
-        correlation_report = analyze_correlations(correlation_data, metrics_df)
+        # Plots render in the background (in worker processes) while the analysis continues
+        with PlotRenderer(args.workers) as renderer:
+            # Analyze correlations
+            correlation_report = analyze_correlations(correlation_data, metrics_df, renderer)
+            
+            # Analyze group correlations
+            group_correlation_report = analyze_metric_group_correlations(correlation_data, metrics_df, renderer)
         
-        # Analyze group correlations
-        group_correlation_report = analyze_metric_group_correlations(correlation_data, metrics_df)
+        # Plots of correlations that are no longer strong are stale
+        prune_plots(PLOT_DIR, renderer.paths)
         
         # Generate report
         generate_correlation_report(correlation_report, group_correlation_report)
@@ -0,0 +1,78 @@
+import numpy as np
+from scipy import fft
+
+# Kernel support in bandwidths; the Gaussian beyond it is below 4e-6 of its peak
+KERNEL_SUPPORT = 5.0
+DEFAULT_TOLERANCE = 1e-3
+MAX_BINS = 1 << 20
+
+
+def scott_bandwidth(values: np.ndarray) -> float:
+    """Return the Gaussian kernel bandwidth of Scott's rule, as used by scipy.stats.gaussian_kde"""
+    return float(np.std(values, ddof=1)) * len(values) ** (-1 / 5)
+
+
+def get_bin_count(data_range: float, bandwidth: float, tolerance: float = DEFAULT_TOLERANCE,
+                  min_bins: int = 2) -> int:
+    """Return the number of bins whose linear-binning error stays within the tolerance.
+
+    The error of linear binning relative to the peak density is of the order
+    of (bin width / bandwidth)^2 / 4, so the bin width is kept below
+    bandwidth * sqrt(2 * tolerance), which leaves a margin of about two.
+    """
+    bin_width = bandwidth * np.sqrt(2 * tolerance)
+    return int(np.clip(np.ceil(data_range / bin_width) + 1, min_bins, MAX_BINS))
+
+
+def binned_kde(values: np.ndarray, grid: np.ndarray, tolerance: float = DEFAULT_TOLERANCE,
+               bandwidth: float = None) -> np.ndarray:
+    """Evaluate a 1-D Gaussian KDE on a grid in O(n + bins log bins) instead of O(n x grid).
+
+    The values are linearly binned onto a uniform grid spanning the data and
+    the requested grid, the bin weights are convolved with the sampled kernel
+    by FFT, and the result is interpolated onto the requested grid. The bandwidth defaults
+    to Scott's rule, so the result matches scipy.stats.gaussian_kde to
+    within `tolerance` of the peak density. Like gaussian_kde, it raises
+    LinAlgError for constant data.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if bandwidth is None:
+        if len(values) < 2:
+            raise np.linalg.LinAlgError("Need at least two values to estimate a density")
+        bandwidth = scott_bandwidth(values)
+    if not bandwidth > 0:
+        raise np.linalg.LinAlgError("Data has zero variance, the kernel covariance is singular")
+
+    grid = np.asarray(grid, dtype=np.float64)
+    lo, hi = float(min(values.min(), grid.min())), float(max(values.max(), grid.max()))
+    n_bins = get_bin_count(hi - lo, bandwidth, tolerance, min_bins=min(len(grid), MAX_BINS))
+    bin_width = (hi - lo) / (n_bins - 1) if hi > lo else bandwidth
+
+    # Linear binning: each value splits its weight between the two nearest grid points
+    position = (values - lo) / bin_width
+    left = np.clip(np.floor(position).astype(np.int64), 0, max(n_bins - 2, 0))
+    right_weight = position - left
+    weights = (np.bincount(left, weights=1 - right_weight, minlength=n_bins)
+               + np.bincount(left + 1, weights=right_weight, minlength=n_bins))[:n_bins]
+
+    # Kernel sampled at whole-bin offsets, zero-padded so the FFT convolution does not wrap around
+    half_width = min(int(np.ceil(KERNEL_SUPPORT * bandwidth / bin_width)), n_bins - 1)
+    offsets = np.arange(-half_width, half_width + 1) * bin_width
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (np.sqrt(2 * np.pi) * bandwidth * len(values))
+    size = fft.next_fast_len(n_bins + 2 * half_width, real=True)
+    convolved = fft.irfft(fft.rfft(weights, size) * fft.rfft(kernel, size), size)
+    density = convolved[half_width:half_width + n_bins]
+
+    # FFT round-off can leave tiny negative densities far from the data
+    bin_centers = lo + np.arange(n_bins) * bin_width
+    return np.maximum(np.interp(grid, bin_centers, density), 0)
+
+
+def max_relative_error(values: np.ndarray, grid: np.ndarray, tolerance: float = DEFAULT_TOLERANCE) -> float:
+    """Return the largest difference between binned_kde and gaussian_kde on a grid, relative to the peak density"""
+    from scipy.stats import gaussian_kde
+
+    exact = gaussian_kde(values)(grid)
+    approx = binned_kde(values, grid, tolerance)
+    return float(np.max(np.abs(approx - exact)) / np.max(exact))
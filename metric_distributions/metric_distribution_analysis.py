@@ -1,17 +1,22 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy import stats
+from scipy import integrate, stats
 import warnings
 import logging
 import shutil
-import gc
+import sys
 warnings.filterwarnings('ignore')
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from metric_partitions import load_metric_partitions, map_partitions
+from fast_kde import binned_kde
+from plot_renderer import PlotJob, prune_plots, render_plot
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,24 +31,22 @@ logging.basicConfig(
 PLOT_DIR = os.path.join('metric_distributions', 'output', 'plots')
 REPORT_DIR = os.path.join('metric_distributions', 'output', 'reports')
 
+# Largest error of the density plots relative to the peak of scipy's gaussian_kde
+KDE_TOLERANCE = 1e-3
+
 def cleanup_outputs():
-    """Clean up previous output files and directories"""
+    """Clean up previous reports; plots are kept and only re-rendered when their inputs change"""
     logging.info("Cleaning up previous outputs...")
     
-    # Remove plot directory if it exists
-    if os.path.exists(PLOT_DIR):
-        shutil.rmtree(PLOT_DIR)
-        logging.info(f"Removed plot directory: {PLOT_DIR}")
-    
     # Remove report directory if it exists
     if os.path.exists(REPORT_DIR):
         shutil.rmtree(REPORT_DIR)
         logging.info(f"Removed report directory: {REPORT_DIR}")
     
-    # Create fresh directories
+    # Create output directories
     os.makedirs(PLOT_DIR, exist_ok=True)
     os.makedirs(REPORT_DIR, exist_ok=True)
-    logging.info("Created fresh output directories")
+    logging.info("Created output directories")
 
 def load_metrics_definitions():
     """Load only the metrics definitions"""
@@ -52,35 +55,12 @@ def load_metrics_definitions():
     logging.info(f"Loaded {len(metrics_df)} metric definitions")
     return metrics_df
 
-def process_metric_data(metric_name, metric_group, chunk_size=10000):
-    """Process data for a single metric in chunks"""
+def process_metric_data(metric_name, partitions):
+    """Return the rows of a single metric from the partitioned company metrics"""
     logging.info(f"Processing data for metric: {metric_name}")
     
-    # Initialize empty list to store processed chunks
-    processed_chunks = []
-    
-    # Read and process data in chunks
-    for chunk in pd.read_csv('company_metrics.csv', chunksize=chunk_size):
-        # Filter for current metric
-        metric_chunk = chunk[chunk['metric_label'] == metric_name].copy()
-        
-        if not metric_chunk.empty:
-            # Convert to numeric and handle non-numeric values
-            metric_chunk['metric_value'] = pd.to_numeric(metric_chunk['metric_value'], errors='coerce')
-            metric_chunk = metric_chunk.dropna(subset=['metric_value'])
-            
-            if not metric_chunk.empty:
-                processed_chunks.append(metric_chunk)
-        
-        # Clear memory
-        del chunk
-        del metric_chunk
-        gc.collect()
-    
-    # Combine processed chunks
-    if processed_chunks:
-        return pd.concat(processed_chunks, ignore_index=True)
-    return pd.DataFrame()
+    # Non-numeric values were coerced to NaN by the shared schema and dropped when partitioning
+    return partitions.get_frame(metric_name)
 
 def detect_outliers(df, column='metric_value', method='zscore', threshold=3):
     """Detect outliers in the data using various methods"""
@@ -103,17 +83,14 @@ def detect_outliers(df, column='metric_value', method='zscore', threshold=3):
     else:
         raise ValueError(f"Unknown outlier detection method: {method}")
 
-def analyze_metric(metric_name, metric_group, unit=''):
+def analyze_metric(metric_name, metric_group, partitions, unit=''):
     """Analyze a single metric"""
     logging.info(f"Analyzing metric: {metric_name}")
     
-    # Process data in chunks
-    metric_df = process_metric_data(metric_name, metric_group)
+    metric_df = process_metric_data(metric_name, partitions)
     
     if len(metric_df) < 5:
         logging.warning(f"Insufficient data for {metric_name}: {len(metric_df)} records")
-        del metric_df
-        gc.collect()
         return None
     
     # Calculate basic statistics
@@ -133,44 +110,51 @@ def analyze_metric(metric_name, metric_group, unit=''):
     logging.info(f"Found {len(outliers_zscore)} Z-score outliers and {len(outliers_iqr)} IQR outliers for {metric_name}")
     
     # Generate plots
-    plot_distribution(metric_df, metric_name, metric_group, unit)
-    
-    # Clear memory
-    del metric_df
-    gc.collect()
+    plot_file = plot_distribution(metric_df, metric_name, metric_group, unit)
     
     return {
         'stats': stats_dict,
         'zscore_outliers': len(outliers_zscore),
-        'iqr_outliers': len(outliers_iqr)
+        'iqr_outliers': len(outliers_iqr),
+        'plot_file': plot_file
     }
 
-def plot_distribution(df, metric_name, metric_group, unit_str=''):
-    """Create a probability density plot for a specific metric (linear scale only)"""
-    plt.figure(figsize=(8, 6))
+def _analyze_metric_task(task, partitions):
+    metric_name, group, unit_str = task
+    return analyze_metric(metric_name, group, partitions, unit_str)
+
+def analyze_metrics(tasks, partitions, workers=1):
+    """Analyze (metric_name, group, unit_str) tasks and return their results in task order.
+
+    With more than one worker the metrics are analyzed in a process pool
+    that reads the partitions from shared memory.
+    """
+    return map_partitions(_analyze_metric_task, tasks, partitions, workers)
+
+def draw_distribution(fig, values, metric_name, unit_str, kde_tolerance):
+    """Draw the probability density of a metric's values (linear scale only)"""
+    series = pd.Series(values)
     
     # Calculate statistics for better plot scaling
-    mean_val = df['metric_value'].mean()
-    std_val = df['metric_value'].std()
-    median_val = df['metric_value'].median()
+    mean_val = series.mean()
+    median_val = series.median()
     
-    fig, ax1 = plt.subplots(1, 1, figsize=(10, 6))
+    ax1 = fig.subplots(1, 1)
     
     # Regular scale plot
     try:
-        # Try using KDE first
-        kde = stats.gaussian_kde(df['metric_value'].dropna())
-        x_range = np.linspace(df['metric_value'].min(), df['metric_value'].max(), 1000)
-        density = kde(x_range)
+        # Try using KDE first (binned FFT estimate, within kde_tolerance of gaussian_kde)
+        x_range = np.linspace(series.min(), series.max(), 1000)
+        density = binned_kde(values, x_range, kde_tolerance)
         # Normalize the density to ensure it integrates to 1
-        density = density / np.trapz(density, x_range)
+        density = density / integrate.trapezoid(density, x_range)
         
         ax1.plot(x_range, density, label='Density')
         ax1.fill_between(x_range, density, alpha=0.3)
     except np.linalg.LinAlgError:
         # Fall back to histogram if KDE fails
-        hist, bins = np.histogram(df['metric_value'].dropna(), bins=50, density=True)
-        ax1.hist(df['metric_value'].dropna(), bins=50, density=True, alpha=0.3, label='Histogram')
+        hist, bins = np.histogram(values, bins=50, density=True)
+        ax1.hist(values, bins=50, density=True, alpha=0.3, label='Histogram')
         ax1.plot(bins[:-1], hist, label='Density')
     
     ax1.set_title(f'Probability Density of {metric_name}{unit_str} (Linear Scale)')
@@ -182,12 +166,23 @@ def plot_distribution(df, metric_name, metric_group, unit_str=''):
     ax1.axvline(median_val, color='green', linestyle='--', label=f'Median: {median_val:,.2f}')
     ax1.legend()
     
-    plt.tight_layout()
+    fig.tight_layout()
+
+def plot_distribution(df, metric_name, metric_group, unit_str=''):
+    """Create a probability density plot for a specific metric, unless an up-to-date one exists; returns its path.
+
+    Rendering errors are raised, so the analysis fails as it did with pyplot.
+    """
     filename = f"{metric_group}_{metric_name}_density.png"
-    plt.savefig(os.path.join(PLOT_DIR, filename))
-    plt.clf()
-    plt.close()
-    gc.collect()
+    job = PlotJob(
+        path=os.path.join(PLOT_DIR, filename),
+        draw=draw_distribution,
+        data={'values': df['metric_value'].dropna().to_numpy()},
+        params={'metric_name': metric_name, 'unit_str': unit_str, 'kde_tolerance': KDE_TOLERANCE},
+        figsize=(10, 6)
+    )
+    render_plot(job, raise_errors=True)
+    return job.path
 
 def generate_report(analysis_results):
     """Generate the analysis report"""
@@ -225,6 +220,11 @@ def generate_report(analysis_results):
 
 def main():
     """Main function to run the analysis"""
+    parser = argparse.ArgumentParser(description="Analyze the distribution of each metric.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes used to analyze metrics in parallel (default: 1)')
+    args = parser.parse_args()
+
     logging.info("Starting metric distribution analysis...")
     
     try:
@@ -234,32 +234,38 @@ def main():
         # Load metrics definitions
         metrics_df = load_metrics_definitions()
         
-        # Initialize results dictionary
-        analysis_results = {}
+        # Read the company metrics once, partitioned into one block per metric
+        logging.info("Partitioning company metrics by metric...")
+        partitions = load_metric_partitions('company_metrics.csv')
+        logging.info(f"Partitioned {partitions.offsets[-1]} values into {len(partitions)} metrics")
         
-        # Process each metric group
+        # List the metrics of each group, in report order
+        tasks = []
         for group in metrics_df['metric_group'].unique():
             if pd.isna(group):
                 continue
-                
-            logging.info(f"Processing group: {group}")
-            analysis_results[group] = {}
             
             # Get metrics for this group
             group_metrics = metrics_df[metrics_df['metric_group'] == group]
             
-            # Process each metric
             for _, metric_row in group_metrics.iterrows():
                 metric_name = metric_row['metric_label']
                 unit = metric_row['metric_unit'] if not pd.isna(metric_row['metric_unit']) else ''
                 unit_str = f" ({unit})" if unit else ""
-                
-                # Analyze metric
-                results = analyze_metric(metric_name, group, unit_str)
-                analysis_results[group][metric_name] = results
-                
-                # Clear memory
-                gc.collect()
+                tasks.append((metric_name, group, unit_str))
+        
+        # Analyze the metrics, results come back in task order
+        logging.info(f"Analyzing {len(tasks)} metrics with {args.workers} worker(s)")
+        results = analyze_metrics(tasks, partitions, args.workers)
+        
+        # Initialize results dictionary
+        analysis_results = {}
+        for (metric_name, group, _), metric_results in zip(tasks, results):
+            analysis_results.setdefault(group, {})[metric_name] = metric_results
+        
+        # Density plots of metrics that no longer have enough data are stale
+        plot_files = [metric_results['plot_file'] for metric_results in results if metric_results is not None]
+        prune_plots(PLOT_DIR, plot_files, pattern='*_density.png')
         
         # Generate final report
         generate_report(analysis_results)
@@ -0,0 +1,107 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+# Columns kept for every outlier, in the order of the archive and the top outlier records
+OUTLIER_COLUMNS = ('metric_group', 'metric_name', 'heron_id', 'metric_date_range', 'metric_value',
+                   'outlier_method', 'outlier_score')
+TEXT_COLUMNS = ('metric_group', 'metric_name', 'heron_id', 'metric_date_range', 'outlier_method')
+ARCHIVE_FORMAT_VERSION = 1
+
+
+def select_outliers(outliers: pd.DataFrame, k=None) -> pd.DataFrame:
+    """Return the outlier columns of the k highest-scoring rows (all rows when k is None).
+
+    The selected rows keep their detection order, so ties are still broken
+    by that order when they are offered to TopOutliers.
+    """
+    outliers = outliers[list(OUTLIER_COLUMNS)]
+    if k is not None and len(outliers) > k:
+        outliers = outliers.nlargest(k, 'outlier_score', keep='first').sort_index(kind='stable')
+    return outliers.reset_index(drop=True)
+
+
+class TopOutliers:
+    """The k highest-scoring outliers offered so far, kept in a bounded min-heap.
+
+    Outliers are offered one metric at a time, straight from detection;
+    equal scores rank in the order they were offered, as in a stable sort of
+    all outliers. Outliers with a missing score are ignored.
+    """
+
+    def __init__(self, k=20):
+        self.k = k
+        self.heap = []
+        self.offered = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, outliers: pd.DataFrame) -> None:
+        """Offer a frame of outliers with the OUTLIER_COLUMNS"""
+        candidates = select_outliers(outliers, self.k)
+        scores = candidates['outlier_score'].to_numpy(dtype=np.float64)
+        for score, record in zip(scores, candidates.itertuples(index=False, name=None)):
+            if np.isnan(score):
+                continue
+            # The negated offer counter ranks earlier outliers above later ones with the same score
+            entry = (score, -self.offered, record)
+            self.offered += 1
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, entry)
+            elif entry[:2] > self.heap[0][:2]:
+                heapq.heapreplace(self.heap, entry)
+
+    def records(self) -> list:
+        """Return the kept outliers as dicts, highest score first"""
+        return [dict(zip(OUTLIER_COLUMNS, record)) for *_, record in sorted(self.heap, reverse=True)]
+
+
+class OutlierArchive:
+    """Every outlier of a run, saved as one compressed columnar .npz file.
+
+    Text columns are stored as int32 codes into a table of their distinct
+    values (code -1 for a missing value), numbers as float64 arrays.
+    """
+
+    def __init__(self):
+        self.frames = []
+
+    def __len__(self):
+        return sum(len(frame) for frame in self.frames)
+
+    def append(self, outliers: pd.DataFrame) -> None:
+        """Keep a frame of outliers with the OUTLIER_COLUMNS"""
+        if not outliers.empty:
+            self.frames.append(select_outliers(outliers))
+
+    def save(self, path) -> None:
+        if self.frames:
+            outliers = pd.concat(self.frames, ignore_index=True)
+        else:
+            outliers = pd.DataFrame({column: [] for column in OUTLIER_COLUMNS})
+        arrays = {'format_version': np.array(ARCHIVE_FORMAT_VERSION)}
+        for column in OUTLIER_COLUMNS:
+            if column in TEXT_COLUMNS:
+                codes, uniques = pd.factorize(outliers[column])
+                arrays[f'{column}_codes'] = codes.astype(np.int32)
+                arrays[f'{column}_values'] = np.asarray(uniques, dtype=str)
+            else:
+                arrays[column] = outliers[column].to_numpy(dtype=np.float64)
+        np.savez_compressed(path, **arrays)
+
+
+def load_outlier_archive(path) -> pd.DataFrame:
+    """Read an outlier archive back into a DataFrame with the OUTLIER_COLUMNS"""
+    with np.load(path) as arrays:
+        if int(arrays['format_version']) != ARCHIVE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported outlier archive format in {path}")
+        columns = {}
+        for column in OUTLIER_COLUMNS:
+            if column in TEXT_COLUMNS:
+                values = np.append(arrays[f'{column}_values'].astype(object), np.nan)
+                columns[column] = values[arrays[f'{column}_codes']]
+            else:
+                columns[column] = arrays[column]
+    return pd.DataFrame(columns)
@@ -0,0 +1,159 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import matplotlib
+import numpy as np
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from code_fingerprint import code_fingerprint
+
+# Bump to re-render every plot, e.g. after changing a helper that a draw function calls
+RENDERER_VERSION = 1
+# PNG text chunk that holds the fingerprint of the inputs a plot was rendered from
+FINGERPRINT_KEY = 'Fingerprint'
+
+
+@dataclass
+class PlotJob:
+    """A plot to render: draw(fig, **data, **params) onto a new figure, saved as a PNG.
+
+    `data` holds the numeric arrays the plot is drawn from and `params` the
+    JSON-serializable labels and settings; both are part of the fingerprint.
+    """
+    path: str
+    draw: Callable
+    data: dict = field(default_factory=dict)
+    params: dict = field(default_factory=dict)
+    figsize: tuple = (10, 6)
+    savefig_kwargs: dict = field(default_factory=dict)
+
+    def fingerprint(self) -> str:
+        """Hash of the draw function, inputs and library versions the PNG depends on"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{RENDERER_VERSION}:{matplotlib.__version__}:{sns.__version__}".encode())
+        digest.update(code_fingerprint(self.draw).encode())
+        digest.update(json.dumps([self.params, self.figsize, self.savefig_kwargs], sort_keys=True).encode())
+        for name in sorted(self.data):
+            array = np.ascontiguousarray(self.data[name])
+            digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+
+def read_png_fingerprint(path) -> Optional[str]:
+    """Return the fingerprint stored in a PNG, or None if there is no readable one"""
+    try:
+        with Image.open(path) as image:
+            return image.info.get(FINGERPRINT_KEY)
+    except (OSError, ValueError):
+        return None
+
+
+def render_plot(job: PlotJob, force=False, raise_errors=False) -> str:
+    """Render a plot with the object-oriented Agg API unless its PNG is up to date.
+
+    Returns 'rendered', 'skipped' (the PNG holds the same fingerprint) or
+    'failed'. A failed plot's PNG is removed, so an earlier run's plot never
+    stands in for the current data; with raise_errors the error is raised
+    instead of returning 'failed'. No pyplot state is used, so plots can
+    render in any process.
+    """
+    fingerprint = job.fingerprint()
+    if not force and read_png_fingerprint(job.path) == fingerprint:
+        return 'skipped'
+    try:
+        fig = Figure(figsize=job.figsize)
+        FigureCanvasAgg(fig)
+        job.draw(fig, **job.data, **job.params)
+        fig.savefig(job.path, metadata={FINGERPRINT_KEY: fingerprint}, **job.savefig_kwargs)
+        return 'rendered'
+    except Exception as e:
+        if os.path.exists(job.path):
+            os.remove(job.path)
+        if raise_errors:
+            raise
+        logging.error(f"Error rendering {job.path}, plot removed: {str(e)}", exc_info=True)
+        return 'failed'
+
+
+class PlotRenderer:
+    """Renders PlotJobs, in a process pool when workers > 1, skipping up-to-date PNGs.
+
+    Use as a context manager; leaving it waits for every submitted plot.
+    """
+
+    def __init__(self, workers=1, force=False):
+        self.force = force
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.pending = {}
+        self.submitted = {}
+        self.failed = set()
+        self.counts = {'rendered': 0, 'skipped': 0, 'failed': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, job: PlotJob) -> None:
+        """Render a plot, or queue it for a worker; a plot already submitted with the same inputs is ignored"""
+        fingerprint = job.fingerprint()
+        if self.submitted.get(job.path) == fingerprint:
+            return
+        if job.path in self.pending:
+            # Another plot with this path is still rendering; let it finish so the later one wins
+            self._count(job.path, self.pending.pop(job.path).result())
+        self.submitted[job.path] = fingerprint
+        if self.executor is None:
+            self._count(job.path, render_plot(job, self.force))
+        else:
+            self.pending[job.path] = self.executor.submit(render_plot, job, self.force)
+
+    def _count(self, path, status) -> None:
+        self.counts[status] += 1
+        if status == 'failed':
+            self.failed.add(path)
+        else:
+            self.failed.discard(path)
+
+    @property
+    def paths(self) -> list:
+        """Paths of the plots submitted so far, without those that failed to render"""
+        return [path for path in self.submitted if path not in self.failed]
+
+    def close(self) -> None:
+        for path, future in self.pending.items():
+            self._count(path, future.result())
+        self.pending = {}
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        logging.info(f"Plots: {self.counts['rendered']} rendered, {self.counts['skipped']} unchanged, "
+                     f"{self.counts['failed']} failed")
+        if self.failed:
+            logging.error(f"{len(self.failed)} plots failed to render: {sorted(self.failed)}")
+
+
+def prune_plots(plot_dir, keep, pattern='*.png') -> int:
+    """Remove plots in plot_dir matching the pattern that are not in keep; returns how many were removed"""
+    keep = {os.path.abspath(path) for path in keep}
+    removed = 0
+    for path in glob.glob(os.path.join(plot_dir, pattern)):
+        if os.path.abspath(path) not in keep:
+            os.remove(path)
+            removed += 1
+    if removed:
+        logging.info(f"Removed {removed} stale plots from {plot_dir}")
+    return removed
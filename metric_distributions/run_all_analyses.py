@@ -1,11 +1,17 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import subprocess
 import time
 
 def main():
     """Run all metric distribution analysis scripts"""
+    parser = argparse.ArgumentParser(description="Run all metric distribution analyses.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes each analysis uses for its per-metric work and plots (default: 1)')
+    args = parser.parse_args()
+
     start_time = time.time()
     print("Starting comprehensive metric analysis...")
     
@@ -30,7 +36,7 @@ def main():
         
         try:
             # Run the script
-            subprocess.run(['python', script_path], check=True)
+            subprocess.run(['python', script_path, '--workers', str(args.workers)], check=True)
             print(f"\n✅ {script} completed successfully.")
         except subprocess.CalledProcessError as e:
             print(f"\n❌ Error running {script}: {e}")
@@ -0,0 +1,135 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class RunningMoments:
+    """Count, min, max, mean and variance of a stream of values, updated a chunk at a time.
+
+    Each chunk's moments are computed with NumPy and merged into the running
+    ones with the pairwise form of Welford's update (Chan et al.), so memory
+    stays constant however many values are added.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return
+        chunk_mean = float(np.mean(values))
+        chunk_m2 = float(np.sum((values - chunk_mean) ** 2))
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(np.min(values)))
+        self.max = max(self.max, float(np.max(values)))
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation, like np.std"""
+        return (self.m2 / self.count) ** 0.5 if self.count else float('nan')
+
+
+class QuantileSketch:
+    """Bounded-memory quantile sketch (a KLL-style compactor hierarchy).
+
+    Values enter level 0 with weight 1. When a level holds more than
+    `capacity` values it is sorted and every other value (from a random
+    offset) moves up one level, where each value counts twice as much.
+    Memory is O(capacity * log(n / capacity)), and a quantile is read from the
+    weighted values. Until the first compaction the sketch is exact.
+    """
+
+    def __init__(self, capacity: int = 1024, seed: int = 0):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compact()
+
+    def _compact(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self.capacity:
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                ordered = np.sort(self.levels[level])
+                # An odd leftover value stays behind so no weight is lost or duplicated
+                if len(ordered) % 2:
+                    ordered, leftover = ordered[:-1], ordered[-1:]
+                else:
+                    leftover = ordered[:0]
+                promoted = ordered[self.rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = leftover
+            level += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-quantile; exact (like np.quantile) while nothing has been compacted"""
+        if len(self.levels) == 1:
+            return float(np.quantile(self.levels[0], q)) if len(self.levels[0]) else None
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1])
+        return float(values[order][min(position, len(values) - 1)])
+
+
+class CombinationAccumulator:
+    """Constant-size validation statistics of one (metric_name, date_range) combination"""
+
+    def __init__(self, sketch_capacity: int = 1024):
+        self.total_validations = 0
+        self.success_count = 0
+        self.severity_counts: Dict[str, int] = {}
+        self.group = None
+        self.moments = RunningMoments()
+        self.sketch = QuantileSketch(sketch_capacity)
+
+    def update(self, passed: np.ndarray, severities: np.ndarray, values: np.ndarray, group) -> None:
+        """Add the rows of one chunk (severities as strings, in row order)"""
+        self.total_validations += len(passed)
+        self.success_count += int(np.count_nonzero(passed))
+        names, first, counts = np.unique(severities, return_index=True, return_counts=True)
+        for i in np.argsort(first):
+            self.severity_counts[names[i]] = self.severity_counts.get(names[i], 0) + int(counts[i])
+        self.group = group
+        self.moments.update(values)
+        self.sketch.update(values)
+
+    def to_stats(self, metric_name, date_range) -> dict:
+        """Return the statistics in the layout of the per-combination summary"""
+        value_stats = None
+        if self.moments.count:
+            value_stats = {
+                'min': self.moments.min,
+                'max': self.moments.max,
+                'mean': self.moments.mean,
+                'median': self.sketch.quantile(0.5),
+                'std': self.moments.std
+            }
+        return {
+            'total_validations': self.total_validations,
+            'success_count': self.success_count,
+            'error_count': self.total_validations - self.success_count,
+            'severity_counts': dict(self.severity_counts),
+            'metric_name': metric_name,
+            'date_range': date_range,
+            'group': self.group,
+            'success_rate': self.success_count / self.total_validations if self.total_validations > 0 else 0,
+            'value_stats': value_stats
+        }
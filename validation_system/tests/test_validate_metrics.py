@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from validate_metrics import check_companies_metric_completeness, expand_combinations, load_company_metrics
+
+
+def make_metrics(rows):
+    return pd.DataFrame(rows, columns=['heron_id', 'metric_label', 'metric_date_range', 'metric_value'])
+
+
+def test_completeness_of_empty_input():
+    results, summary = check_companies_metric_completeness(load_company_metrics(make_metrics([])))
+
+    assert results == {}
+    assert summary['total_companies'] == 0
+    assert summary['unique_missing_combinations'] == 0
+    assert summary['most_frequently_missing_combinations'] == {}
+
+
+def test_completeness_without_companies():
+    # Rows without a heron_id leave no companies and no combinations
+    metrics_data = load_company_metrics(make_metrics([[None, 'revenue', 'last_30_days', 1.0]]))
+    results, summary = check_companies_metric_completeness(metrics_data)
+
+    assert metrics_data.presence.shape == (0, 0)
+    assert results == {}
+    assert summary['companies_with_missing_metric_time_ranges'] == 0
+
+
+def test_most_frequently_missing_combinations():
+    metrics_data = load_company_metrics(make_metrics([
+        ['a', 'revenue', 'last_30_days', 1.0],
+        ['a', 'revenue', 'last_90_days', 2.0],
+        ['b', 'revenue', 'last_30_days', 3.0],
+    ]))
+    results, summary = check_companies_metric_completeness(metrics_data)
+
+    assert results['a']['has_all_metric_time_ranges']
+    assert results['b']['missing_metric_time_ranges'] == [('revenue', 'last_90_days')]
+    assert summary['most_frequently_missing_combinations'] == {('revenue', 'last_90_days'): 1}
+
+
+def test_expand_combinations_without_companies():
+    metrics_data = load_company_metrics(make_metrics([[None, 'revenue', 'last_30_days', 1.0]]))
+    expanded = expand_combinations(metrics_data, [('revenue', 'last_30_days')])
+
+    assert expanded.combinations == [('revenue', 'last_30_days')]
+    assert expanded.presence.shape == (0, 1)
+    assert expanded.row_combination_codes.tolist() == [-1]
@@ -3,12 +3,23 @@ import json
 import logging
 from pathlib import Path
 from validators.metric_validator import MetricValidator
-from validators.base_validator import ValidationSeverity
+from validators.base_validator import ValidationResultStore, ValidationSeverity
 import argparse
+import sys
 import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
 import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'data_processing'))
+from metrics_cache import load_company_metrics_frame
+from metrics_schema import apply_schema, coerce_metric_values, get_read_dtypes
+from pivot_kernel import WideMatrixBuilder, reduce_cells
+from streaming_stats import CombinationAccumulator
+from validation_cache import (ValidationCache, get_validation_cache_dir, hash_rows, load_validation_cache,
+                              save_validation_cache)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,235 +32,374 @@ OUTPUT_DIR = Path(__file__).parent / "validation_results"
 OUTPUT_CSV = OUTPUT_DIR / "company_metrics_validated.csv"
 OUTPUT_SUMMARY_JSON = OUTPUT_DIR / "validation_summary.json"
 
-def load_company_metrics(file_path: str) -> dict:
-    """Load company metrics from CSV file for company-level validation"""
-    df = pd.read_csv(file_path)
-    metrics_dict = {}
-    for _, row in df.iterrows():
-        company_id = row['heron_id']
-        metric_name = row['metric_label']
-        metric_value = row['metric_value']
-        metric_date_range = row.get('metric_date_range', 'None')  # Use a default string for missing date range
-        
-        if company_id not in metrics_dict:
-            metrics_dict[company_id] = {}
-        
-        # Convert string values to appropriate types
-        if pd.isna(metric_value):
-            value = None
-        else:
-            value = metric_value
-            if isinstance(value, str):
-                try:
-                    value = float(value)
-                    if value.is_integer():
-                        value = int(value)
-                except ValueError:
-                    pass
-        
-        # Store value under a key that includes both metric name and date range
-        # Using a tuple (metric_name, date_range) as the key
-        metric_key = (metric_name, metric_date_range)
-        metrics_dict[company_id][metric_key] = value
-
-    return metrics_dict
-
-def check_companies_metric_completeness(metrics_data: dict) -> dict:
-    """Check if each company has all required metrics defined in the rules, considering time ranges."""
-    
-    # Collect all unique (metric_name, date_range) combinations across all companies
-    all_metric_time_ranges = set()
-    for company_metrics in metrics_data.values():
-        for metric_key in company_metrics.keys():
-            all_metric_time_ranges.add(metric_key)
-    
-    # Check each company for missing metric-time range combinations
-    completeness_results = {}
-    for company_id, company_metrics in metrics_data.items():
-        company_metric_time_ranges = set(company_metrics.keys())
-        missing_metric_time_ranges = all_metric_time_ranges - company_metric_time_ranges
-        
-        # Group missing combinations by metric name
-        missing_by_metric = defaultdict(list)
-        for metric_name, date_range in missing_metric_time_ranges:
-             missing_by_metric[metric_name].append(date_range)
-        
-        # Calculate the number of unique metric names for the company
-        unique_metric_names = set()
-        for metric_name, date_range in company_metrics.keys():
-            unique_metric_names.add(metric_name)
-        
-        completeness_results[company_id] = {
-            'has_all_metric_time_ranges': len(missing_metric_time_ranges) == 0,
-            'missing_count': len(missing_metric_time_ranges),
-            'missing_metric_time_ranges': sorted(list(missing_metric_time_ranges)), # Sort for consistent output
-            'missing_by_metric': dict(missing_by_metric),
-            'total_metric_time_ranges': len(company_metric_time_ranges),
-            'coverage_percentage': (len(company_metric_time_ranges) / len(all_metric_time_ranges)) * 100 if all_metric_time_ranges else 100,
-            'total_unique_metrics': len(unique_metric_names) # Add total unique metrics
-        }
-    
-    # Calculate summary statistics
-    total_companies = len(completeness_results)
-    companies_with_missing = sum(1 for r in completeness_results.values() if not r['has_all_metric_time_ranges'])
-    all_missing_combinations = set()
-    for result in completeness_results.values():
-        all_missing_combinations.update(result['missing_metric_time_ranges'])
-    
-    # Count how many companies are missing each combination
-    combination_missing_counts = defaultdict(int)
-    for result in completeness_results.values():
-        for combination in result['missing_metric_time_ranges']:
-            combination_missing_counts[combination] += 1
-    
-    summary = {
-        'total_companies': total_companies,
-        'companies_with_missing_metric_time_ranges': companies_with_missing,
-        'companies_with_all_metric_time_ranges': total_companies - companies_with_missing,
-        'percent_complete_combinations': ((total_companies - companies_with_missing) / total_companies) * 100 if total_companies else 0,
-        'unique_missing_combinations': len(all_missing_combinations),
-        'most_frequently_missing_combinations': dict(sorted(combination_missing_counts.items(), key=lambda x: x[1], reverse=True)[:10])
+# Streaming combination keys pack (metric code, date range code)
+COMBINATION_KEY_SHIFT = 32
+
+@dataclass
+class CompanyMetricCodes:
+    """Distinct (company, metric, date range) combinations encoded as integer codes"""
+    company_ids: np.ndarray         # heron_id for each company code, in order of first appearance
+    combinations: list              # (metric_name, date_range) for each combination code, sorted
+    presence: np.ndarray            # boolean company x combination matrix of the pairs present in the data
+    values: np.ndarray              # company x combination metric values (first value of each pair), NaN if absent
+    row_company_codes: np.ndarray   # company code of each input row, -1 for rows without a heron_id
+    row_combination_codes: np.ndarray  # combination code of each input row, -1 for rows without a heron_id
+    unique_metric_counts: np.ndarray  # number of distinct metric names per company
+
+    def __len__(self):
+        return len(self.company_ids)
+
+
+def _factorize_with_missing(values, sort=True):
+    """Factorize values, giving missing entries their own trailing code instead of -1"""
+    codes, uniques = pd.factorize(values, sort=sort)
+    uniques = np.asarray(uniques, dtype=object)
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(uniques), codes)
+        uniques = np.append(uniques, np.nan)
+    return codes, uniques
+
+
+def load_company_metrics(df: pd.DataFrame) -> CompanyMetricCodes:
+    """Encode the loaded metrics DataFrame for company-level completeness checks"""
+    has_company = df['heron_id'].notna().to_numpy()
+    df = df[has_company]
+    company_codes, company_ids = pd.factorize(np.asarray(df['heron_id']))
+    metric_codes, metric_names = _factorize_with_missing(np.asarray(df['metric_label']))
+    if 'metric_date_range' in df.columns:
+        date_range_codes, date_ranges = _factorize_with_missing(np.asarray(df['metric_date_range']))
+    else:
+        # Use a default string for missing date range
+        date_range_codes, date_ranges = np.zeros(len(df), dtype=np.int64), np.array(['None'], dtype=object)
+
+    # Metric names and date ranges are sorted, so combined codes follow tuple sort order
+    pair_codes = metric_codes.astype(np.int64) * len(date_ranges) + date_range_codes
+    combination_values, combination_index = np.unique(pair_codes, return_inverse=True)
+    combination_index = combination_index.ravel()
+    combinations = [
+        (metric_names[code // len(date_ranges)], date_ranges[code % len(date_ranges)])
+        for code in combination_values
+    ]
+
+    presence = np.zeros((len(company_ids), len(combinations)), dtype=bool)
+    presence[company_codes, combination_index] = True
+
+    # Wide value matrix for cross-metric checks; duplicate pairs keep their first value
+    cells, cell_values, _, _, _ = reduce_cells(
+        company_codes.astype(np.int64) * len(combinations) + combination_index,
+        to_validation_array(df['metric_value']))
+    values = np.full(presence.shape, np.nan)
+    values.flat[cells] = cell_values
+
+    row_company_codes = np.full(len(has_company), -1, dtype=np.int64)
+    row_company_codes[has_company] = company_codes
+    row_combination_codes = np.full(len(has_company), -1, dtype=np.int64)
+    row_combination_codes[has_company] = combination_index
+
+    # Count distinct metric names per company
+    company_metric_pairs = np.unique(company_codes.astype(np.int64) * len(metric_names) + metric_codes)
+    unique_metric_counts = np.bincount(company_metric_pairs // len(metric_names), minlength=len(company_ids))
+
+    return CompanyMetricCodes(
+        company_ids=np.asarray(company_ids, dtype=object),
+        combinations=combinations,
+        presence=presence,
+        values=values,
+        row_company_codes=row_company_codes,
+        row_combination_codes=row_combination_codes,
+        unique_metric_counts=unique_metric_counts
+    )
+
+def expand_combinations(metrics_data: CompanyMetricCodes, expected_combinations) -> CompanyMetricCodes:
+    """Re-lay the encoded metrics over the union of their combinations and an expected set.
+
+    Completeness is then judged against the expected combinations as well,
+    e.g. when a batch holds a single company.
+    """
+    combinations = sorted(set(metrics_data.combinations) | set(expected_combinations), key=lambda combination: tuple(
+        (pd.isna(part), '' if pd.isna(part) else part) for part in combination))
+    if len(combinations) == len(metrics_data.combinations):
+        return metrics_data
+    position = {combination: i for i, combination in enumerate(combinations)}
+    columns = np.array([position[combination] for combination in metrics_data.combinations], dtype=np.int64)
+
+    presence = np.zeros((len(metrics_data), len(combinations)), dtype=bool)
+    presence[:, columns] = metrics_data.presence
+    values = np.full(presence.shape, np.nan)
+    values[:, columns] = metrics_data.values
+    # Rows without a heron_id keep code -1; there may be no combinations to index at all
+    row_codes = metrics_data.row_combination_codes
+    row_combination_codes = np.full(len(row_codes), -1, dtype=np.int64)
+    has_combination = row_codes >= 0
+    row_combination_codes[has_combination] = columns[row_codes[has_combination]]
+    return replace(metrics_data, combinations=combinations, presence=presence, values=values,
+                   row_combination_codes=row_combination_codes)
+
+def get_company_completeness(metrics_data: CompanyMetricCodes, company_code: int) -> dict:
+    """Return the completeness details of one company from the presence matrix"""
+    n_combinations = len(metrics_data.combinations)
+    missing = np.flatnonzero(~metrics_data.presence[company_code])
+    missing_metric_time_ranges = [metrics_data.combinations[code] for code in missing]
+
+    # Group missing combinations by metric name
+    missing_by_metric = defaultdict(list)
+    for metric_name, date_range in missing_metric_time_ranges:
+        missing_by_metric[metric_name].append(date_range)
+
+    total_metric_time_ranges = n_combinations - len(missing)
+    return {
+        'has_all_metric_time_ranges': len(missing) == 0,
+        'missing_count': len(missing),
+        'missing_metric_time_ranges': missing_metric_time_ranges, # Sorted by combination code
+        'missing_by_metric': dict(missing_by_metric),
+        'total_metric_time_ranges': total_metric_time_ranges,
+        'coverage_percentage': (total_metric_time_ranges / n_combinations) * 100 if n_combinations else 100,
+        'total_unique_metrics': int(metrics_data.unique_metric_counts[company_code])
     }
-    
-    return completeness_results, summary
 
-def get_metric_group(metric_name, validator):
-    """Get the group a metric belongs to"""
-    for group_name, rules in validator.metric_rules.rules.items():
-        if any(rule.metric_name == metric_name for rule in rules):
-            return group_name
-    return None
-
-def validate_metrics(input_csv: str, output_csv: str, output_summary: str):
-    """Validate all metrics and produce a comprehensive CSV file and summary JSON, considering time ranges."""
-    start_time = time.time()
-    validator = MetricValidator()
+def iter_company_completeness(metrics_data: CompanyMetricCodes):
+    """Yield (heron_id, completeness details) for each company, one company at a time"""
+    for company_code, company_id in enumerate(metrics_data.company_ids):
+        yield company_id, get_company_completeness(metrics_data, company_code)
 
-    # Read the input CSV
-    df = pd.read_csv(input_csv)
+def summarize_completeness(metrics_data: CompanyMetricCodes) -> dict:
+    """Summarize metric completeness over all companies, considering time ranges."""
+    n_companies, n_combinations = metrics_data.presence.shape
+    missing_matrix = ~metrics_data.presence
 
-    # Get the metrics dictionary for completeness checking (keys are now (metric_name, date_range))
-    metrics_data = load_company_metrics(input_csv)
+    # Per-company and per-combination counts over the presence matrix
+    present_counts = np.count_nonzero(metrics_data.presence, axis=1)
+    combination_missing_counts = np.count_nonzero(missing_matrix, axis=0)
 
-    # Check for metric completeness including time ranges
-    completeness_results, completeness_summary = check_companies_metric_completeness(metrics_data)
-
-    # Prepare additional columns for the output
-    validation_passed = []
-    validation_message = []
-    expected_min = []
-    expected_max = []
-    severity = []
-    metric_group = []
-    is_missing_combination = [] # Renamed to reflect checking combinations
-    company_has_all_combinations = [] # Renamed to reflect checking combinations
-
-    # Initialize statistics collectors
-    # Stats will be per (metric_name, date_range) combination
-    combination_stats = defaultdict(lambda: {
-        'total_validations': 0,
-        'success_count': 0,
-        'error_count': 0,
-        'severity_counts': defaultdict(int),
-        'values': [],
-        'metric_name': None,
-        'date_range': None,
-        'group': None
-    })
+    # First company missing each combination, for stable tie-breaking below (argmax fails on an empty matrix)
+    first_missing_company = np.full(n_combinations, n_companies, dtype=np.int64)
+    if missing_matrix.size:
+        first_missing_company = np.where(combination_missing_counts > 0, missing_matrix.argmax(axis=0), n_companies)
 
-    # Process each row from the original DataFrame to add validation results and stats
-    for idx, row in df.iterrows():
-        company_id = row['heron_id']
-        metric_name = row['metric_label']
-        metric_value = row['metric_value']
-        metric_date_range = row.get('metric_date_range', 'None')
-
-        # Form the key for the metric-time range combination
-        metric_key = (metric_name, metric_date_range)
-
-        # Get metric group for the base metric name
-        group = get_metric_group(metric_name, validator)
-        metric_group.append(group)
-
-        # Add company completeness info for this specific combination
-        if company_id in completeness_results:
-            # Check if this specific combination is missing for this company
-            is_missing = metric_key in completeness_results[company_id]['missing_metric_time_ranges']
-            is_missing_combination.append(is_missing)
-            company_has_all_combinations.append(completeness_results[company_id]['has_all_metric_time_ranges'])
-        else:
-            # Should not happen if company was processed by load_company_metrics
-            is_missing_combination.append(False)
-            company_has_all_combinations.append(True)
+    # Calculate summary statistics
+    total_companies = n_companies
+    companies_with_missing = int(np.count_nonzero(present_counts < n_combinations))
+    missing_combination_codes = np.flatnonzero(combination_missing_counts > 0)
 
-        # Convert to proper type for validation (using the value from the row directly)
-        if pd.isna(metric_value):
-            value = None
-        else:
-            value = metric_value
-            if isinstance(value, str):
-                try:
-                    value = float(value)
-                    if value.is_integer():
-                        value = int(value)
-                except ValueError:
-                    pass
-
-        # Validate the metric (using the base metric name and value)
-        result = validator.validate(value, metric_name)
-        validation_passed.append(result.is_valid)
-        validation_message.append(result.message)
-
-        # Extract expected range
-        if result.expected_range and len(result.expected_range) == 2:
-            expected_min.append(result.expected_range[0])
-            expected_max.append(result.expected_range[1])
-        else:
-            expected_min.append(None)
-            expected_max.append(None)
+    # Most frequently missing combinations, ties kept in order of first appearance
+    first_seen_order = missing_combination_codes[np.lexsort((missing_combination_codes,
+                                                             first_missing_company[missing_combination_codes]))]
+    most_frequent = first_seen_order[np.argsort(-combination_missing_counts[first_seen_order], kind='stable')][:10]
 
-        severity.append(result.severity.value)
+    return {
+        'total_companies': total_companies,
+        'companies_with_missing_metric_time_ranges': companies_with_missing,
+        'companies_with_all_metric_time_ranges': total_companies - companies_with_missing,
+        'percent_complete_combinations': ((total_companies - companies_with_missing) / total_companies) * 100 if total_companies else 0,
+        'unique_missing_combinations': len(missing_combination_codes),
+        'most_frequently_missing_combinations': {
+            metrics_data.combinations[code]: int(combination_missing_counts[code]) for code in most_frequent
+        }
+    }
 
-        # Update combination statistics
-        combination_stats[metric_key]['total_validations'] += 1
-        combination_stats[metric_key]['success_count'] += int(result.is_valid)
-        combination_stats[metric_key]['error_count'] += int(not result.is_valid)
-        combination_stats[metric_key]['severity_counts'][result.severity.value] += 1
-        if result.value is not None:
-            combination_stats[metric_key]['values'].append(result.value)
-        combination_stats[metric_key]['metric_name'] = metric_name
-        combination_stats[metric_key]['date_range'] = metric_date_range
-        combination_stats[metric_key]['group'] = group
+def check_companies_metric_completeness(metrics_data: CompanyMetricCodes) -> tuple:
+    """Check if each company has all required metrics defined in the rules, considering time ranges."""
+    completeness_results = dict(iter_company_completeness(metrics_data))
+    return completeness_results, summarize_completeness(metrics_data)
 
+def get_metric_group(metric_name, validator):
+    """Get the group a metric belongs to"""
+    return validator.metric_rules.get_group_for_metric(metric_name)
+
+def to_validation_array(metric_values: pd.Series) -> np.ndarray:
+    """Convert metric values to a float array for validation, with NaN for missing values"""
+    if not pd.api.types.is_numeric_dtype(metric_values):
+        metric_values = coerce_metric_values(metric_values)
+    return metric_values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+def get_company_shards(company_ids: np.ndarray, n_shards: int) -> np.ndarray:
+    """Assign each company to a shard by a stable hash of its heron_id"""
+    hashes = pd.util.hash_array(np.asarray(company_ids, dtype=object))
+    return (hashes % np.uint64(n_shards)).astype(np.int64)
+
+def _validate_shard(task, validator: MetricValidator = None) -> tuple:
+    """Validate the rows and companies of one shard (in a worker process, unless a validator is passed)"""
+    metric_names, values, company_values, combinations = task
+    validator = validator or MetricValidator()
+    return (validator.validate_columns(metric_names, values),
+            validator.validate_dependencies(company_values, combinations))
+
+def run_rule_validation(df: pd.DataFrame, metrics_data: CompanyMetricCodes, workers=None,
+                        cache: ValidationCache = None, cache_positions: np.ndarray = None,
+                        validator: MetricValidator = None) -> tuple:
+    """Run the row rules and the cross-metric rules, sharded by heron_id across worker processes.
+
+    Rows found in the validation cache (cache_positions >= 0) reuse their
+    cached result instead of being validated again. Returns the row results
+    in input order and the cross-metric results, exactly as a single-process,
+    uncached run would produce them. A single shard runs in-process, with the
+    given validator if any.
+    """
+    metric_names = df['metric_label'].to_numpy(dtype=object)
+    values = to_validation_array(df['metric_value'])
+    if cache is not None:
+        cached_rows = np.flatnonzero(cache_positions >= 0)
+        pending = cache_positions < 0
+        logger.info(f"Reusing cached validation results for {len(cached_rows)} of {len(df)} rows")
+    else:
+        cached_rows = np.empty(0, dtype=np.int64)
+        pending = np.ones(len(df), dtype=bool)
+
+    n_shards = max(1, min(workers or 1, len(metrics_data)))
+    if n_shards == 1:
+        rows = np.flatnonzero(pending)
+        store, dependency_results = _validate_shard(
+            (metric_names[rows], values[rows], metrics_data.values, metrics_data.combinations), validator)
+        row_groups, stores = [rows], [store]
+    else:
+        # Rows without a heron_id go to the first shard
+        company_shards = get_company_shards(metrics_data.company_ids, n_shards)
+        row_companies = metrics_data.row_company_codes
+        row_shards = np.where(row_companies >= 0, company_shards[row_companies], 0)
+        row_groups = [np.flatnonzero(pending & (row_shards == shard)) for shard in range(n_shards)]
+        shard_companies = [np.flatnonzero(company_shards == shard) for shard in range(n_shards)]
+        tasks = [
+            (metric_names[rows], values[rows], metrics_data.values[companies], metrics_data.combinations)
+            for rows, companies in zip(row_groups, shard_companies)
+        ]
+        logger.info(f"Validating {int(np.count_nonzero(pending))} rows in {n_shards} heron_id shards...")
+        with ProcessPoolExecutor(max_workers=n_shards) as executor:
+            shard_results = list(executor.map(_validate_shard, tasks))
+        stores = [store for store, _ in shard_results]
+
+        # Shards evaluate the same (rule, date range) entries; merge counts and company positions
+        dependency_results = shard_results[0][1]
+        for entry, shard_entries in zip(dependency_results, zip(*[entries for _, entries in shard_results])):
+            entry['checked_count'] = sum(shard_entry['checked_count'] for shard_entry in shard_entries)
+            entry['failed_rows'] = np.sort(np.concatenate([
+                companies[shard_entry['failed_rows']]
+                for companies, shard_entry in zip(shard_companies, shard_entries)
+            ]))
+
+    if len(cached_rows):
+        row_groups.append(cached_rows)
+        stores.append(cache.take(cache_positions[cached_rows], metric_names[cached_rows], values[cached_rows]))
+
+    # Put the row results back in input order
+    rows = np.concatenate(row_groups)
+    inverse = np.empty(len(rows), dtype=np.int64)
+    inverse[rows] = np.arange(len(rows))
+    results = ValidationResultStore.concat(stores).take(inverse)
+    return results, dependency_results
+
+def validate_rows(df: pd.DataFrame, validator: MetricValidator, metrics_data: CompanyMetricCodes,
+                  results: ValidationResultStore) -> dict:
+    """Combine the rule validation results with metric groups and completeness flags into the result columns"""
+    metric_names = df['metric_label'].to_numpy(dtype=object)
+
+    # Metric groups resolved once per distinct metric
+    metric_codes, unique_metrics = pd.factorize(metric_names)
+    groups = [get_metric_group(metric_name, validator) for metric_name in unique_metrics] + [None]
+    metric_group = np.array(groups, dtype=object)[metric_codes]
+
+    # Completeness flags looked up per row in the company x combination presence matrix
+    row_companies = metrics_data.row_company_codes
+    has_company = row_companies >= 0
+    is_missing_combination = np.zeros(len(df), dtype=bool)
+    is_missing_combination[has_company] = ~metrics_data.presence[
+        row_companies[has_company], metrics_data.row_combination_codes[has_company]]
+    company_complete = metrics_data.presence.all(axis=1)
+    company_has_all_combinations = np.ones(len(df), dtype=bool)
+    company_has_all_combinations[has_company] = company_complete[row_companies[has_company]]
+
+    # Message and severity text is looked up from the interned tables when the columns are written
+    return {
+        'validation_passed': results.is_valid,
+        'validation_message': results.message_column(),
+        'expected_min': results.expected_min_column().tolist(),  # Lists let pandas infer numeric bounds
+        'expected_max': results.expected_max_column().tolist(),
+        'severity': results.severity_column(),
+        'metric_group': metric_group,
+        'is_missing_combination': is_missing_combination,
+        'company_has_all_combinations': company_has_all_combinations
+    }
 
-    # Add columns to the DataFrame
-    df['validation_passed'] = validation_passed
-    df['validation_message'] = validation_message
-    df['expected_min'] = expected_min
-    df['expected_max'] = expected_max
-    df['severity'] = severity
-    df['metric_group'] = metric_group
-    df['is_missing_combination'] = is_missing_combination # Renamed column
-    df['company_has_all_combinations'] = company_has_all_combinations # Renamed column
-
-    # Process combination statistics
-    processed_combination_stats = {}
-    for combination_key, stats in combination_stats.items():
-        stats['success_rate'] = stats['success_count'] / stats['total_validations'] if stats['total_validations'] > 0 else 0
-        if stats['values']:
-            stats['value_stats'] = {
-                'min': float(np.min(stats['values'])),
-                'max': float(np.max(stats['values'])),
-                'mean': float(np.mean(stats['values'])),
-                'median': float(np.median(stats['values'])),
-                'std': float(np.std(stats['values']))
+def compute_combination_statistics(df: pd.DataFrame, row_results: dict) -> dict:
+    """Aggregate validation results and value statistics per (metric_name, date_range) combination"""
+    if 'metric_date_range' in df.columns:
+        date_ranges = df['metric_date_range'].to_numpy(dtype=object)
+    else:
+        date_ranges = np.full(len(df), 'None', dtype=object)
+    metric_codes, metric_names = _factorize_with_missing(df['metric_label'].to_numpy(dtype=object), sort=False)
+    date_range_codes, date_range_values = _factorize_with_missing(date_ranges, sort=False)
+
+    # Combination codes in order of first appearance, rows grouped stably by combination
+    pair_codes = metric_codes.astype(np.int64) * len(date_range_values) + date_range_codes
+    combination_codes, combination_values = pd.factorize(pair_codes)
+    order = np.argsort(combination_codes, kind='stable')
+    bounds = np.searchsorted(combination_codes[order], np.arange(len(combination_values) + 1))
+
+    passed = row_results['validation_passed']
+    severity = row_results['severity']
+    metric_group = row_results['metric_group']
+    values = df['metric_value'].to_numpy(dtype=float)
+
+    combination_stats = {}
+    for code, pair_code in enumerate(combination_values):
+        rows = order[bounds[code]:bounds[code + 1]]
+        metric_name = metric_names[pair_code // len(date_range_values)]
+        date_range = date_range_values[pair_code % len(date_range_values)]
+        total_validations = len(rows)
+        success_count = int(np.count_nonzero(passed[rows]))
+
+        severity_codes, severity_first, severity_counts = np.unique(
+            severity.codes[rows], return_index=True, return_counts=True)
+        severity_order = np.argsort(severity_first)
+
+        row_values = values[rows]
+        row_values = row_values[~np.isnan(row_values)]
+        if len(row_values):
+            value_stats = {
+                'min': float(np.min(row_values)),
+                'max': float(np.max(row_values)),
+                'mean': float(np.mean(row_values)),
+                'median': float(np.median(row_values)),
+                'std': float(np.std(row_values))
             }
         else:
-            stats['value_stats'] = None
-        del stats['values']  # Remove raw values to keep JSON size manageable
-        processed_combination_stats[f"{combination_key[0]} ({combination_key[1]})"] = stats # Format key for readability
+            value_stats = None
+
+        combination_stats[(metric_name, date_range)] = {
+            'total_validations': total_validations,
+            'success_count': success_count,
+            'error_count': total_validations - success_count,
+            'severity_counts': {severity.categories[severity_codes[i]]: int(severity_counts[i]) for i in severity_order},
+            'metric_name': metric_name,
+            'date_range': date_range,
+            'group': metric_group[rows[-1]],
+            'success_rate': success_count / total_validations if total_validations > 0 else 0,
+            'value_stats': value_stats
+        }
 
-    # Recalculate group statistics based on combination stats
+    return combination_stats
+
+def summarize_cross_metric_results(dependency_results: list, company_ids: np.ndarray) -> tuple:
+    """Summarize cross-metric rule results per rule and date range, and list the violations per company"""
+    rule_stats = {}
+    company_violations = defaultdict(list)
+    for result in dependency_results:
+        key = f"{result['rule']} ({result['date_range']})"
+        failed_count = len(result['failed_rows'])
+        rule_stats[key] = {
+            'description': result['description'],
+            'severity': result['severity'],
+            'metrics': result['metrics'],
+            'date_range': result['date_range'],
+            'checked_companies': result['checked_count'],
+            'failed_companies': failed_count,
+            'failure_rate': failed_count / result['checked_count'] if result['checked_count'] else 0
+        }
+        for company_id in company_ids[result['failed_rows']]:
+            company_violations[company_id].append(key)
+    return rule_stats, dict(company_violations)
+
+def compute_group_statistics(combination_stats: dict) -> dict:
+    """Aggregate the per-combination statistics per metric group"""
     group_stats = defaultdict(lambda: {
         'total_validations': 0,
         'success_count': 0,
@@ -269,107 +419,104 @@ def validate_metrics(input_csv: str, output_csv: str, output_summary: str):
         stats['success_rate'] = stats['success_count'] / stats['total_validations'] if stats['total_validations'] > 0 else 0
         stats['metrics_and_ranges'] = sorted([f"{m} ({dr})" for m, dr in list(stats['metrics_and_ranges'])]) # Format and sort
 
-    # Calculate validation statistics
-    execution_time = time.time() - start_time
-    total_companies = len(metrics_data)
+    return dict(group_stats)
 
-    # Count companies with validation errors (based on validation_passed column)
-    companies_with_errors = df[df['validation_passed'] == False]['heron_id'].nunique()
+def get_company_details_path(output_summary) -> Path:
+    """Return the per-company details file that sits next to the summary JSON"""
+    output_summary = Path(output_summary)
+    return output_summary.with_name(f"{output_summary.stem}.companies.ndjson")
 
-    companies_missing_combinations = completeness_summary['companies_with_missing_metric_time_ranges'] # Get from completeness_summary
-    total_combinations_in_data = len(df) # Total rows in the input data is the total combinations present
-    total_errors = sum(1 for passed in validation_passed if not passed)
+def build_summary(execution_info: dict, combination_stats: dict, completeness_summary: dict,
+                  cross_metric_stats: dict, company_cross_metric_violations: dict, company_details_file=None) -> dict:
+    """Assemble the validation summary from the execution counts and the collected statistics.
+
+    Per-company details are not part of it; they are streamed to the
+    company details file by save_summary.
+    """
+    processed_combination_stats = {
+        f"{combination_key[0]} ({combination_key[1]})": stats # Format key for readability
+        for combination_key, stats in combination_stats.items()
+    }
+    group_stats = compute_group_statistics(combination_stats)
+
+    # Top combinations by error count, keys formatted for JSON
+    sorted_error_distribution = sorted(
+        combination_stats.items(),
+        key=lambda item: item[1]['error_count'],
+        reverse=True
+    )[:10]
 
     # Generate comprehensive summary
     summary = {
-        'execution_info': {
-            'total_companies': total_companies,
-            'companies_with_validation_errors': companies_with_errors, # Renamed key
-            'companies_missing_combinations': companies_missing_combinations, # Renamed key
-            'total_combinations_in_data': total_combinations_in_data, # Renamed key
-            'total_validation_errors': total_errors, # Renamed key
-            'execution_time_seconds': execution_time
-        },
+        'execution_info': execution_info,
         'error_distribution_by_combination': {
              f"{combination_key[0]} ({combination_key[1]})": stats['error_count'] # Format key
-             for combination_key, stats in sorted(
-                combination_stats.items(),
-                key=lambda item: item[1]['error_count'],
-                reverse=True
-            )
+             for combination_key, stats in sorted_error_distribution
         },
         'severity_distribution': {
             severity: sum(stats['severity_counts'].get(severity, 0) for stats in combination_stats.values())
             for severity in ValidationSeverity.__members__
         },
         'combination_statistics': processed_combination_stats, # Renamed key
-        'group_statistics': dict(group_stats),
-        'completeness_summary': completeness_summary
+        'group_statistics': group_stats,
+        'completeness_summary': {
+            **completeness_summary,
+            'most_frequently_missing_combinations': {
+                f"{m} ({dr})": count
+                for (m, dr), count in completeness_summary['most_frequently_missing_combinations'].items()
+            }
+        },
+        'cross_metric_validation': {
+            'companies_with_violations': len(company_cross_metric_violations),
+            'rules': cross_metric_stats
+        },
+        'company_details_file': str(company_details_file) if company_details_file else None
     }
 
-    # Ensure output directories exist
-    Path(output_csv).parent.mkdir(exist_ok=True)
+    return summary
 
-    # Save the validated DataFrame as CSV
-    df.to_csv(output_csv, index=False)
+def save_summary(summary: dict, metrics_data: CompanyMetricCodes, company_cross_metric_violations: dict,
+                 output_summary: str) -> None:
+    """Write the summary JSON and stream the per-company details to its NDJSON sidecar.
 
-    # Save summary as JSON
-    with open(output_summary, 'w') as f:
-        # Convert tuple keys and values to strings for JSON serialization
-        serializable_summary = summary.copy()
-
-        # Process the completeness_results (per-company details) for JSON serialization
-        processed_company_completeness_details = {}
-        for company_id, result in completeness_results.items(): # Iterate over original completeness_results
-            # Convert list of tuples to list of strings
-            processed_missing_metric_time_ranges = [f"{m} ({dr})" for m, dr in result['missing_metric_time_ranges']]
-            # The missing_by_metric keys are already strings, values are lists of strings
-            processed_company_completeness_details[company_id] = {
+    The sidecar holds one JSON object per line and company (completeness and
+    cross-metric violations), written as each company's details are computed.
+    """
+    with open(get_company_details_path(output_summary), 'w') as f:
+        for company_id, result in iter_company_completeness(metrics_data):
+            record = {
+                'heron_id': company_id,
                 'has_all_metric_time_ranges': result['has_all_metric_time_ranges'],
                 'missing_count': result['missing_count'],
-                'missing_metric_time_ranges': processed_missing_metric_time_ranges,
-                'missing_by_metric': result['missing_by_metric'], # Already has string keys and list of strings values
+                'missing_metric_time_ranges': [f"{m} ({dr})" for m, dr in result['missing_metric_time_ranges']],
+                'missing_by_metric': result['missing_by_metric'],
                 'total_metric_time_ranges': result['total_metric_time_ranges'],
                 'coverage_percentage': result['coverage_percentage'],
-                'total_unique_metrics': result['total_unique_metrics']
+                'total_unique_metrics': result['total_unique_metrics'],
+                'cross_metric_violations': company_cross_metric_violations.get(company_id, [])
             }
-        serializable_summary['company_completeness_details'] = processed_company_completeness_details # Add processed details to summary
-
-        # Process error_distribution_by_combination keys for JSON serialization
-        processed_error_distribution = {}
-        # Iterate over original combination_stats to get error counts
-        for combination_key, stats in combination_stats.items():
-             processed_error_distribution[f"{combination_key[0]} ({combination_key[1]})"] = stats['error_count']
-        # Sort the processed error distribution by count
-        sorted_error_distribution_items = sorted(
-            processed_error_distribution.items(),
-            key=lambda item: item[1],
-            reverse=True
-        )
-        serializable_summary['error_distribution_by_combination'] = dict(sorted_error_distribution_items[:10]) # Slice the list before converting to dict
-
-        # Process most_frequently_missing_combinations keys for JSON serialization
-        processed_missing_combinations_summary = {}
-        for combination_key, count in serializable_summary['completeness_summary']['most_frequently_missing_combinations'].items():
-            processed_missing_combinations_summary[f"{combination_key[0]} ({combination_key[1]})"] = count
-        serializable_summary['completeness_summary']['most_frequently_missing_combinations'] = processed_missing_combinations_summary
-
-        # combination_statistics is already processed into processed_combination_stats with string keys
-        # group_statistics already has string keys and values are serializable
-        # completeness_summary (overall summary) is already serializable, except for the missing combinations part we just fixed
-
-        json.dump(serializable_summary, f, indent=2)
-
-    # Log summary information
+            f.write(json.dumps(record))
+            f.write('\n')
+
+    with open(output_summary, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+def log_summary(summary: dict, combination_stats: dict, completeness_summary: dict, cross_metric_stats: dict,
+                output_csv: str, output_summary: str) -> None:
+    """Log where the results were saved and the headline numbers of the run"""
+    execution_info = summary['execution_info']
+
     logger.info(f"Validation results saved to:")
     logger.info(f"- CSV: {output_csv}")
     logger.info(f"- Summary JSON: {output_summary}")
-    logger.info(f"Total companies validated: {total_companies}")
-    logger.info(f"Companies with validation errors: {companies_with_errors}")
-    logger.info(f"Companies missing combinations: {companies_missing_combinations}")
-    logger.info(f"Total combinations validated: {total_combinations_in_data}")
-    logger.info(f"Total validation errors: {total_errors}")
-    logger.info(f"Execution time: {execution_time:.2f} seconds")
+    logger.info(f"- Company details: {summary['company_details_file']}")
+    logger.info(f"Total companies validated: {execution_info['total_companies']}")
+    logger.info(f"Companies with validation errors: {execution_info['companies_with_validation_errors']}")
+    logger.info(f"Companies missing combinations: {execution_info['companies_missing_combinations']}")
+    logger.info(f"Total combinations validated: {execution_info['total_combinations_in_data']}")
+    logger.info(f"Total validation errors: {execution_info['total_validation_errors']}")
+    logger.info(f"Execution time: {execution_info['execution_time_seconds']:.2f} seconds "
+                f"({execution_info['rows_per_second']:,.0f} rows/sec)")
 
     # Log missing combinations information
     if completeness_summary['most_frequently_missing_combinations']:
@@ -377,6 +524,15 @@ def validate_metrics(input_csv: str, output_csv: str, output_summary: str):
         for combination, count in list(completeness_summary['most_frequently_missing_combinations'].items())[:5]:
             logger.info(f"- {combination}: missing in {count} companies")
 
+    # Log the cross-metric rules with most violations
+    top_cross_metric_rules = sorted(
+        cross_metric_stats.items(), key=lambda item: item[1]['failed_companies'], reverse=True)[:5]
+    if top_cross_metric_rules and top_cross_metric_rules[0][1]['failed_companies'] > 0:
+        logger.info("\nCross-metric rules with most violations:")
+        for rule_key, stats in top_cross_metric_rules:
+            if stats['failed_companies'] > 0:
+                logger.info(f"- {rule_key}: {stats['failed_companies']} of {stats['checked_companies']} companies")
+
     # Log top combinations with most errors
     top_error_combinations = sorted(
         combination_stats.items(),
@@ -389,16 +545,271 @@ def validate_metrics(input_csv: str, output_csv: str, output_summary: str):
             if stats['error_count'] > 0:
                 logger.info(f"- {combination_key[0]} ({combination_key[1]}): {stats['error_count']} errors")
 
+def validate_metrics(input_csv: str, output_csv: str, output_summary: str, read_workers=None, workers=None,
+                     cache_dir=None):
+    """Validate all metrics and produce a comprehensive CSV file and summary JSON, considering time ranges."""
+    start_time = time.time()
+    validator = MetricValidator()
+
+    # Read the input CSV (through the shared columnar cache)
+    df = load_company_metrics_frame(input_csv, workers=read_workers)
+
+    # Encode the loaded metrics for completeness checking (combinations are (metric_name, date_range))
+    metrics_data = load_company_metrics(df)
+
+    # Check for metric completeness including time ranges
+    completeness_summary = summarize_completeness(metrics_data)
+
+    # Results of unchanged rows are reused from the previous run when the rules are the same
+    cache, cache_positions = None, None
+    if cache_dir:
+        rule_version = validator.metric_rules.get_version()
+        row_hashes = hash_rows(df, to_validation_array(df['metric_value']))
+        cache = load_validation_cache(cache_dir, rule_version)
+        cache_positions = cache.lookup(row_hashes) if cache is not None else None
+
+    # Row rules and cross-metric rules (on the company x combination value matrix), sharded by heron_id
+    results, dependency_results = run_rule_validation(df, metrics_data, workers, cache, cache_positions,
+                                                      validator)
+    if cache_dir:
+        save_validation_cache(cache_dir, rule_version, row_hashes, results)
+    cross_metric_stats, company_cross_metric_violations = summarize_cross_metric_results(
+        dependency_results, metrics_data.company_ids)
+
+    # Result columns: validation results, metric groups and completeness flags
+    row_results = validate_rows(df, validator, metrics_data, results)
+
+    # Add columns to the DataFrame
+    for column, values in row_results.items():
+        df[column] = values
+
+    # Per-combination statistics computed from the result columns
+    combination_stats = compute_combination_statistics(df, row_results)
+
+    # Calculate validation statistics
+    execution_time = time.time() - start_time
+    total_companies = len(metrics_data)
+
+    # Count companies with validation errors (based on validation_passed column)
+    companies_with_errors = df[df['validation_passed'] == False]['heron_id'].nunique()
+
+    companies_missing_combinations = completeness_summary['companies_with_missing_metric_time_ranges'] # Get from completeness_summary
+    total_combinations_in_data = len(df) # Total rows in the input data is the total combinations present
+    total_errors = int(np.count_nonzero(~row_results['validation_passed']))
+    rows_per_second = total_combinations_in_data / execution_time if execution_time > 0 else float('inf')
+
+    execution_info = {
+        'total_companies': total_companies,
+        'companies_with_validation_errors': companies_with_errors, # Renamed key
+        'companies_missing_combinations': companies_missing_combinations, # Renamed key
+        'total_combinations_in_data': total_combinations_in_data, # Renamed key
+        'total_validation_errors': total_errors, # Renamed key
+        'execution_time_seconds': execution_time,
+        'rows_per_second': rows_per_second
+    }
+
+    # Generate comprehensive summary
+    summary = build_summary(execution_info, combination_stats, completeness_summary,
+                            cross_metric_stats, company_cross_metric_violations,
+                            get_company_details_path(output_summary))
+
+    # Ensure output directories exist
+    Path(output_csv).parent.mkdir(exist_ok=True)
+
+    # Save the validated DataFrame as CSV
+    df.to_csv(output_csv, index=False)
+
+    # Save summary as JSON
+    save_summary(summary, metrics_data, company_cross_metric_violations, output_summary)
+
+    log_summary(summary, combination_stats, completeness_summary, cross_metric_stats, output_csv, output_summary)
+
+def read_metric_chunks(input_csv: str, chunk_size: int):
+    """Read the long-format metrics CSV in chunks of chunk_size rows, cast to the shared metrics schema"""
+    for chunk in pd.read_csv(input_csv, chunksize=chunk_size, dtype=get_read_dtypes()):
+        yield apply_schema(chunk)
+
+def _assign_global_codes(values, codes: dict) -> np.ndarray:
+    """Map values to codes that stay stable across chunks, in order of first appearance (missing values share None)"""
+    local_codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    mapping = [codes.setdefault(value, len(codes)) for value in uniques]
+    if (local_codes < 0).any():
+        mapping.append(codes.setdefault(None, len(codes)))
+    return np.array(mapping, dtype=np.int64)[local_codes]
+
+def get_combination_keys(chunk: pd.DataFrame, metric_codes: dict, date_range_codes: dict) -> np.ndarray:
+    """Integer (metric_name, date_range) keys of a chunk's rows, stable across chunks"""
+    metric_keys = _assign_global_codes(chunk['metric_label'], metric_codes)
+    if 'metric_date_range' in chunk.columns:
+        date_ranges = chunk['metric_date_range']
+    else:
+        date_ranges = np.full(len(chunk), 'None', dtype=object)  # Use a default string for missing date range
+    return (metric_keys << COMBINATION_KEY_SHIFT) | _assign_global_codes(date_ranges, date_range_codes)
+
+def decode_combination_key(key: int, metric_names: dict, date_range_names: dict) -> tuple:
+    """Return the (metric_name, date_range) of a combination key, with NaN for missing values"""
+    metric_name = metric_names[key >> COMBINATION_KEY_SHIFT]
+    date_range = date_range_names[key & ((1 << COMBINATION_KEY_SHIFT) - 1)]
+    return (np.nan if metric_name is None else metric_name, np.nan if date_range is None else date_range)
+
+def scan_company_metrics(input_csv: str, chunk_size: int, metric_codes: dict, date_range_codes: dict) -> tuple:
+    """First streaming pass: build the company x combination presence and value matrices chunk by chunk.
+
+    Memory grows with the number of companies and combinations, not with the
+    number of rows. Returns the encoded metrics, laid out like
+    load_company_metrics (without per-row codes), and an index of the
+    combination keys in combination code order.
+    """
+    values = WideMatrixBuilder(dtype=np.float64, duplicate_policy='first')
+    presence = WideMatrixBuilder(dtype=np.float32)
+    for chunk in read_metric_chunks(input_csv, chunk_size):
+        keys = get_combination_keys(chunk, metric_codes, date_range_codes)
+        has_company = chunk['heron_id'].notna().to_numpy()
+        heron_ids = chunk['heron_id'].to_numpy(dtype=object)[has_company]
+        values.add_chunk(heron_ids, keys[has_company], to_validation_array(chunk['metric_value'])[has_company])
+        presence.add_chunk(heron_ids, keys[has_company], np.ones(int(np.count_nonzero(has_company))))
+
+    # Sort the combinations like load_company_metrics does: by metric name, then date range, missing last
+    metric_names = {code: name for name, code in metric_codes.items()}
+    date_range_names = {code: name for name, code in date_range_codes.items()}
+    keys = np.array(list(values.col_codes), dtype=np.int64)
+    combinations = [decode_combination_key(key, metric_names, date_range_names) for key in keys]
+    order = np.array(sorted(range(len(keys)), key=lambda i: tuple(
+        (pd.isna(part), '' if pd.isna(part) else part) for part in combinations[i])), dtype=np.int64)
+    combinations = [combinations[i] for i in order]
+
+    n_companies = len(values.row_codes)
+    value_matrix = np.array(values.matrix[:n_companies][:, order])
+    presence_matrix = ~np.isnan(presence.matrix[:n_companies][:, order])
+    values.close()
+    presence.close()
+
+    # Count distinct metric names per company; the sorted combinations keep each metric contiguous
+    metric_of_combination = keys[order] >> COMBINATION_KEY_SHIFT
+    starts = np.flatnonzero(np.r_[True, metric_of_combination[1:] != metric_of_combination[:-1]]) if len(order) else order
+    unique_metric_counts = (np.logical_or.reduceat(presence_matrix, starts, axis=1).sum(axis=1) if len(starts)
+                            else np.zeros(n_companies, dtype=np.int64))
+
+    metrics_data = CompanyMetricCodes(
+        company_ids=np.array(list(presence.row_codes), dtype=object),
+        combinations=combinations,
+        presence=presence_matrix,
+        values=value_matrix,
+        row_company_codes=np.empty(0, dtype=np.int64),
+        row_combination_codes=np.empty(0, dtype=np.int64),
+        unique_metric_counts=unique_metric_counts
+    )
+    return metrics_data, pd.Index(keys[order])
+
+def update_combination_accumulators(accumulators: dict, keys: np.ndarray, row_results: dict, values: np.ndarray) -> None:
+    """Fold a validated chunk into the per-combination accumulators, creating them in order of first appearance"""
+    chunk_codes, chunk_keys = pd.factorize(keys)
+    order = np.argsort(chunk_codes, kind='stable')
+    bounds = np.searchsorted(chunk_codes[order], np.arange(len(chunk_keys) + 1))
+    severity = np.asarray(row_results['severity'], dtype=str)
+    for code, key in enumerate(chunk_keys):
+        rows = order[bounds[code]:bounds[code + 1]]
+        if key not in accumulators:
+            accumulators[key] = CombinationAccumulator()
+        accumulators[key].update(row_results['validation_passed'][rows], severity[rows], values[rows],
+                                 row_results['metric_group'][rows[-1]])
+
+def validate_metrics_streaming(input_csv: str, output_csv: str, output_summary: str, chunk_size: int):
+    """Validate the metrics chunk by chunk, with memory that does not grow with the number of rows.
+
+    A first pass builds the completeness and value matrices. The second pass
+    validates each chunk, appends it to the output CSV and folds it into
+    constant-size per-combination accumulators (Welford moments and a quantile
+    sketch for the median), so value statistics may differ from a single-pass
+    run in the last digits and medians are estimates for large combinations.
+    """
+    start_time = time.time()
+    validator = MetricValidator()
+
+    # First pass: completeness and cross-metric rules need every company's combinations
+    metric_codes, date_range_codes = {}, {}
+    metrics_data, combination_index = scan_company_metrics(input_csv, chunk_size, metric_codes, date_range_codes)
+    completeness_summary = summarize_completeness(metrics_data)
+    dependency_results = validator.validate_dependencies(metrics_data.values, metrics_data.combinations)
+    cross_metric_stats, company_cross_metric_violations = summarize_cross_metric_results(
+        dependency_results, metrics_data.company_ids)
+
+    # Second pass: validate, write and accumulate one chunk at a time
+    Path(output_csv).parent.mkdir(exist_ok=True)
+    company_index = pd.Index(metrics_data.company_ids)
+    accumulators = {}
+    company_has_errors = np.zeros(len(metrics_data), dtype=bool)
+    total_rows, total_errors = 0, 0
+    for chunk_number, chunk in enumerate(read_metric_chunks(input_csv, chunk_size)):
+        keys = get_combination_keys(chunk, metric_codes, date_range_codes)
+        company_codes = company_index.get_indexer(chunk['heron_id'].to_numpy(dtype=object))
+        chunk_data = replace(metrics_data, row_company_codes=company_codes,
+                             row_combination_codes=combination_index.get_indexer(keys))
+        values = to_validation_array(chunk['metric_value'])
+        results = validator.validate_columns(chunk['metric_label'].to_numpy(dtype=object), values)
+        row_results = validate_rows(chunk, validator, chunk_data, results)
+        # Float bounds, so every chunk writes them the way a single-pass run does
+        row_results['expected_min'] = np.array(row_results['expected_min'], dtype=np.float64)
+        row_results['expected_max'] = np.array(row_results['expected_max'], dtype=np.float64)
+
+        for column, column_values in row_results.items():
+            chunk[column] = column_values
+        chunk.to_csv(output_csv, mode='w' if chunk_number == 0 else 'a', header=chunk_number == 0, index=False)
+
+        update_combination_accumulators(accumulators, keys, row_results, values)
+        failed = ~row_results['validation_passed']
+        company_has_errors[company_codes[failed & (company_codes >= 0)]] = True
+        total_rows += len(chunk)
+        total_errors += int(np.count_nonzero(failed))
+        logger.info(f"Validated chunk {chunk_number + 1} ({total_rows} rows so far)")
+
+    metric_names = {code: name for name, code in metric_codes.items()}
+    date_range_names = {code: name for name, code in date_range_codes.items()}
+    combination_stats = {}
+    for key, accumulator in accumulators.items():
+        metric_name, date_range = decode_combination_key(key, metric_names, date_range_names)
+        combination_stats[(metric_name, date_range)] = accumulator.to_stats(metric_name, date_range)
+
+    execution_time = time.time() - start_time
+    execution_info = {
+        'total_companies': len(metrics_data),
+        'companies_with_validation_errors': int(np.count_nonzero(company_has_errors)),
+        'companies_missing_combinations': completeness_summary['companies_with_missing_metric_time_ranges'],
+        'total_combinations_in_data': total_rows,
+        'total_validation_errors': total_errors,
+        'execution_time_seconds': execution_time,
+        'rows_per_second': total_rows / execution_time if execution_time > 0 else float('inf')
+    }
+    summary = build_summary(execution_info, combination_stats, completeness_summary,
+                            cross_metric_stats, company_cross_metric_violations,
+                            get_company_details_path(output_summary))
+    save_summary(summary, metrics_data, company_cross_metric_violations, output_summary)
+    log_summary(summary, combination_stats, completeness_summary, cross_metric_stats, output_csv, output_summary)
+
 def main():
     parser = argparse.ArgumentParser(description="Validate company metrics.")
     parser.add_argument('--input', default='company_metrics.csv', help='Input CSV file')
+    parser.add_argument('--read-workers', type=int, default=None,
+                        help='Processes used to parse the input CSV when it is not cached (default: all cores)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes used to validate heron_id shards of the input (default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Stream the input in chunks of this many rows with bounded memory '
+                             '(value statistics are accumulated per chunk; --workers and the cache are not used)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Validate every row instead of reusing results of unchanged rows from the previous run')
     args = parser.parse_args()
 
     # Ensure output directory exists
     OUTPUT_DIR.mkdir(exist_ok=True)
 
     # Validate metrics and generate CSV + summary JSON
-    validate_metrics(args.input, str(OUTPUT_CSV), str(OUTPUT_SUMMARY_JSON))
+    if args.chunk_size:
+        validate_metrics_streaming(args.input, str(OUTPUT_CSV), str(OUTPUT_SUMMARY_JSON), args.chunk_size)
+    else:
+        cache_dir = None if args.no_cache else get_validation_cache_dir(OUTPUT_DIR)
+        validate_metrics(args.input, str(OUTPUT_CSV), str(OUTPUT_SUMMARY_JSON), args.read_workers, args.workers,
+                         cache_dir)
 
     logger.info(f"Validation complete.")
 
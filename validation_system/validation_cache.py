@@ -0,0 +1,130 @@
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from validators.base_validator import ValidationResultStore
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = '.validation_cache'
+MANIFEST_NAME = 'manifest.json'
+RESULTS_NAME = 'results.npz'
+TABLES_NAME = 'tables.json'
+# Bump when the validator changes how it turns a rule and a value into a result
+CACHE_FORMAT_VERSION = 1
+KEY_COLUMNS = ('heron_id', 'metric_label', 'metric_date_range')
+
+
+def get_validation_cache_dir(output_dir) -> Path:
+    """Return the validation cache directory kept next to the validation results"""
+    return Path(output_dir) / CACHE_DIR_NAME
+
+
+def hash_rows(df: pd.DataFrame, values: np.ndarray) -> np.ndarray:
+    """Return a 64-bit content hash of each row's (heron_id, metric_label, metric_date_range, metric_value)"""
+    keys = pd.DataFrame({column: df[column] for column in KEY_COLUMNS if column in df.columns})
+    keys['metric_value'] = values
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+class ValidationCache:
+    """Results of a previous run, looked up by row hash"""
+
+    def __init__(self, row_hashes, is_valid, message_codes, messages, range_codes, ranges, severity_codes):
+        self.row_hashes = row_hashes
+        self.is_valid = is_valid
+        self.message_codes = message_codes
+        self.messages = messages
+        self.range_codes = range_codes
+        self.ranges = ranges
+        self.severity_codes = severity_codes
+
+    def __len__(self):
+        return len(self.row_hashes)
+
+    def lookup(self, row_hashes: np.ndarray) -> np.ndarray:
+        """Return the cache position of each row hash, -1 where the row is not cached"""
+        if len(self.row_hashes) == 0:
+            return np.full(len(row_hashes), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.row_hashes, row_hashes), len(self.row_hashes) - 1)
+        return np.where(self.row_hashes[positions] == row_hashes, positions, -1)
+
+    def take(self, positions: np.ndarray, metric_names: np.ndarray, values: np.ndarray) -> ValidationResultStore:
+        """Return the cached results at the given positions for rows with these metric names and values"""
+        return ValidationResultStore(
+            metric_names=metric_names,
+            values=values,
+            is_valid=self.is_valid[positions],
+            message_codes=self.message_codes[positions],
+            messages=self.messages,
+            range_codes=self.range_codes[positions],
+            ranges=self.ranges,
+            severity_codes=self.severity_codes[positions]
+        )
+
+
+def load_validation_cache(cache_dir, rule_version: str) -> Optional[ValidationCache]:
+    """Load the cached results, or None when there are none or they were made with other rules"""
+    cache_dir = Path(cache_dir)
+    manifest_path = cache_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if (manifest.get('format_version') != CACHE_FORMAT_VERSION
+                or manifest.get('rule_version') != rule_version):
+            logger.info("Validation rules changed since the cached run, validating all rows")
+            return None
+        with open(cache_dir / TABLES_NAME) as f:
+            tables = json.load(f)
+        arrays = np.load(cache_dir / RESULTS_NAME)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return ValidationCache(
+        row_hashes=arrays['row_hashes'],
+        is_valid=arrays['is_valid'],
+        message_codes=arrays['message_codes'],
+        messages=tables['messages'],
+        range_codes=arrays['range_codes'],
+        # JSON keeps ints and floats apart, so bounds come back exactly as they were written
+        ranges=[None if bounds is None else tuple(bounds) for bounds in tables['ranges']],
+        severity_codes=arrays['severity_codes']
+    )
+
+
+def save_validation_cache(cache_dir, rule_version: str, row_hashes: np.ndarray,
+                          results: ValidationResultStore) -> None:
+    """Replace the cache with this run's results, one entry per distinct row hash.
+
+    The manifest is written last so a partially written cache is never
+    picked up.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = cache_dir / MANIFEST_NAME
+    if manifest_path.exists():
+        manifest_path.unlink()
+
+    row_hashes, first = np.unique(row_hashes, return_index=True)
+    np.savez(cache_dir / RESULTS_NAME,
+             row_hashes=row_hashes,
+             is_valid=results.is_valid[first],
+             message_codes=results.message_codes[first],
+             range_codes=results.range_codes[first],
+             severity_codes=results.severity_codes[first])
+    with open(cache_dir / TABLES_NAME, 'w') as f:
+        json.dump({'messages': results.messages, 'ranges': results.ranges}, f)
+
+    manifest = {
+        'format_version': CACHE_FORMAT_VERSION,
+        'rule_version': rule_version,
+        'rows': len(row_hashes)
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
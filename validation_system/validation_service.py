@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+import pandas as pd
+
+from validate_metrics import (check_companies_metric_completeness, expand_combinations, load_company_metrics,
+                              run_rule_validation, summarize_cross_metric_results, validate_rows)
+from validators.metric_validator import MetricValidator
+from metrics_cache import load_company_metrics_frame  # data_processing is on sys.path via validate_metrics
+from metrics_schema import apply_schema
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+INPUT_COLUMNS = ('heron_id', 'metric_label', 'metric_date_range', 'metric_value')
+RESULT_COLUMNS = ('validation_passed', 'validation_message', 'expected_min', 'expected_max', 'severity',
+                  'metric_group', 'is_missing_combination', 'company_has_all_combinations')
+
+
+def _json_value(value):
+    """Convert NumPy scalars and NaN to plain JSON values"""
+    if isinstance(value, (np.bool_, bool)):
+        return bool(value)
+    if isinstance(value, (np.integer, int)):
+        return int(value)
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+class ValidationService:
+    """Warm MetricValidator that validates batches of metric rows in-process.
+
+    The rules are compiled once at start-up. When a reference metrics CSV is
+    given, completeness is judged against the (metric_name, date_range)
+    combinations seen in it, so a batch with a single company is still
+    checked for missing metrics.
+    """
+
+    def __init__(self, reference_csv=None):
+        self.validator = MetricValidator()
+        self.rule_version = self.validator.metric_rules.get_version()
+        self.expected_combinations = []
+        if reference_csv:
+            reference = load_company_metrics_frame(reference_csv, usecols=['metric_label', 'metric_date_range'])
+            pairs = reference.drop_duplicates()
+            self.expected_combinations = list(zip(pairs['metric_label'].astype(object),
+                                                  pairs['metric_date_range'].astype(object)))
+            logger.info(f"Loaded {len(self.expected_combinations)} expected combinations from {reference_csv}")
+
+    def parse_rows(self, body: bytes, content_type: str) -> pd.DataFrame:
+        """Parse a request body into a long-format DataFrame.
+
+        JSON bodies hold either {"rows": [{column: value, ...}, ...]} or
+        {"columns": {column: [values], ...}}. Arrow IPC streams need pyarrow.
+        """
+        if content_type == ARROW_CONTENT_TYPE:
+            try:
+                import pyarrow as pa
+            except ImportError:
+                raise ValueError("Arrow batches need pyarrow, which is not installed; send JSON instead")
+            df = pa.ipc.open_stream(io.BytesIO(body)).read_all().to_pandas()
+        else:
+            payload = json.loads(body)
+            if 'rows' in payload:
+                # An empty list of rows is an empty batch, not one without columns
+                df = pd.DataFrame.from_records(payload['rows'], columns=None if payload['rows'] else list(INPUT_COLUMNS))
+            elif 'columns' in payload:
+                df = pd.DataFrame(payload['columns'])
+            else:
+                raise ValueError('Expected a JSON object with "rows" or "columns"')
+        missing = [column for column in INPUT_COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+        return apply_schema(df[list(INPUT_COLUMNS)].copy())
+
+    def validate(self, df: pd.DataFrame) -> dict:
+        """Validate a batch of rows and return the row results, completeness and cross-metric results"""
+        start_time = time.perf_counter()
+        if df.empty:
+            # Nothing to validate: an empty batch is trivially valid
+            return {
+                'rule_version': self.rule_version,
+                'rows': [],
+                'completeness': {},
+                'cross_metric_violations': {},
+                'elapsed_ms': (time.perf_counter() - start_time) * 1000
+            }
+        metrics_data = expand_combinations(load_company_metrics(df), self.expected_combinations)
+        completeness_results, completeness_summary = check_companies_metric_completeness(metrics_data)
+        results, dependency_results = run_rule_validation(df, metrics_data, validator=self.validator)
+        cross_metric_stats, company_violations = summarize_cross_metric_results(
+            dependency_results, metrics_data.company_ids)
+        row_results = validate_rows(df, self.validator, metrics_data, results)
+
+        columns = {column: [_json_value(value) for value in np.asarray(row_results[column], dtype=object)]
+                   for column in RESULT_COLUMNS}
+        completeness = {
+            company_id: {
+                'has_all_metric_time_ranges': result['has_all_metric_time_ranges'],
+                'missing_count': result['missing_count'],
+                'missing_metric_time_ranges': [f"{m} ({dr})" for m, dr in result['missing_metric_time_ranges']],
+                'coverage_percentage': result['coverage_percentage']
+            }
+            for company_id, result in completeness_results.items()
+        }
+        return {
+            'rule_version': self.rule_version,
+            'rows': [dict(zip(RESULT_COLUMNS, values)) for values in zip(*columns.values())],
+            'completeness': completeness,
+            'cross_metric_violations': company_violations,
+            'elapsed_ms': (time.perf_counter() - start_time) * 1000
+        }
+
+
+class ValidationServer:
+    """Minimal asyncio HTTP/1.1 front end for a ValidationService.
+
+    Routes: GET /health and POST /validate. Validation runs on a single
+    worker thread so the event loop keeps accepting connections.
+    """
+
+    def __init__(self, service: ValidationService):
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Request body too large'})
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self.route(method, path, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, headers: dict, body: bytes) -> tuple:
+        if method == 'GET' and path == '/health':
+            return HTTPStatus.OK, {'status': 'ok', 'rule_version': self.service.rule_version}
+        if method == 'POST' and path == '/validate':
+            content_type = headers.get('content-type', 'application/json').split(';')[0].strip()
+            loop = asyncio.get_running_loop()
+            try:
+                df = self.service.parse_rows(body, content_type)
+                return HTTPStatus.OK, await loop.run_in_executor(self.executor, self.service.validate, df)
+            except (ValueError, KeyError, TypeError) as e:
+                return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+            except Exception as e:
+                # Answer instead of dropping the connection on an unexpected failure
+                logger.exception(f"Error validating batch: {str(e)}")
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"Internal error: {str(e)}"}
+        return HTTPStatus.NOT_FOUND, {'error': f"No route for {method} {path}"}
+
+    async def respond(self, writer: asyncio.StreamWriter, status: HTTPStatus, payload: dict,
+                      keep_alive: bool = False) -> None:
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None) -> None:
+        if unix_socket:
+            server = await asyncio.start_unix_server(self.handle, path=unix_socket)
+            logger.info(f"Validation service listening on unix socket {unix_socket}")
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            logger.info(f"Validation service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve metric validation over HTTP with a warm validator.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--unix-socket', default=None, help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--reference', default=None,
+                        help='Metrics CSV whose (metric, date range) combinations every company is expected to have')
+    args = parser.parse_args()
+
+    service = ValidationService(args.reference)
+    asyncio.run(ValidationServer(service).serve(args.host, args.port, args.unix_socket))
+
+
+if __name__ == "__main__":
+    main()
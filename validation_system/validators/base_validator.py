@@ -3,6 +3,8 @@ from typing import Any, Dict, List, Optional, Union
 from dataclasses import dataclass
 from enum import Enum
 import logging
+import numpy as np
+import pandas as pd
 
 class ValidationSeverity(Enum):
     ERROR = "error"
@@ -19,6 +21,131 @@ class ValidationResult:
     expected_range: Optional[tuple] = None
     details: Optional[Dict] = None
 
+# Severities in code order for ValidationResultStore.severity_codes
+SEVERITY_ORDER = tuple(ValidationSeverity)
+SEVERITY_CODES = {severity: code for code, severity in enumerate(SEVERITY_ORDER)}
+
+class InternTable:
+    """Assigns a small integer code to each distinct item, in order of first appearance"""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+
+    @staticmethod
+    def _key(item):
+        # Keep 0 and 0.0 (and tuples of them) apart so bounds are written exactly as defined
+        if isinstance(item, tuple):
+            return tuple((type(x), x) for x in item)
+        return (type(item), item)
+
+    def code(self, item) -> int:
+        key = self._key(item)
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.items)
+            self.items.append(item)
+        return code
+
+    def remap(self, items) -> np.ndarray:
+        """Return the codes in this table of another table's items"""
+        return np.array([self.code(item) for item in items], dtype=np.int32)
+
+class ValidationResultStore:
+    """Columnar validation results: per-row flags and codes into interned message and range tables.
+
+    Each row takes a few bytes (validity, message code, range code, severity
+    code) instead of a ValidationResult object; the objects are built lazily
+    when the store is indexed or iterated.
+    """
+
+    def __init__(self, metric_names, values, is_valid, message_codes, messages,
+                 range_codes, ranges, severity_codes):
+        self.metric_names = metric_names
+        self.values = values
+        self.is_valid = is_valid
+        self.message_codes = message_codes
+        self.messages = messages
+        self.range_codes = range_codes
+        self.ranges = ranges
+        self.severity_codes = severity_codes
+
+    @classmethod
+    def from_results(cls, results: List[ValidationResult]) -> 'ValidationResultStore':
+        """Build a store from ValidationResult objects"""
+        messages, ranges = InternTable(), InternTable()
+        return cls(
+            metric_names=np.array([result.metric_name for result in results], dtype=object),
+            values=np.array([np.nan if result.value is None else result.value for result in results], dtype=np.float64),
+            is_valid=np.array([bool(result.is_valid) for result in results], dtype=bool),
+            message_codes=np.array([messages.code(result.message) for result in results], dtype=np.int32),
+            messages=messages.items,
+            range_codes=np.array([ranges.code(result.expected_range) for result in results], dtype=np.int16),
+            ranges=ranges.items,
+            severity_codes=np.array([SEVERITY_CODES[result.severity] for result in results], dtype=np.int8)
+        )
+
+    @classmethod
+    def concat(cls, stores: List['ValidationResultStore']) -> 'ValidationResultStore':
+        """Concatenate stores in order, merging their message and range tables"""
+        messages, ranges = InternTable(), InternTable()
+        message_codes, range_codes = [np.empty(0, dtype=np.int32)], [np.empty(0, dtype=np.int16)]
+        for store in stores:
+            if len(store):
+                message_codes.append(messages.remap(store.messages)[store.message_codes])
+                range_codes.append(ranges.remap(store.ranges)[store.range_codes].astype(np.int16))
+        return cls(
+            metric_names=np.concatenate([np.empty(0, dtype=object)] + [store.metric_names for store in stores]),
+            values=np.concatenate([np.empty(0)] + [store.values for store in stores]),
+            is_valid=np.concatenate([np.empty(0, dtype=bool)] + [store.is_valid for store in stores]),
+            message_codes=np.concatenate(message_codes),
+            messages=messages.items,
+            range_codes=np.concatenate(range_codes),
+            ranges=ranges.items,
+            severity_codes=np.concatenate([np.empty(0, dtype=np.int8)] + [store.severity_codes for store in stores])
+        )
+
+    def take(self, indices) -> 'ValidationResultStore':
+        """Return the rows at the given positions, sharing the message and range tables"""
+        return ValidationResultStore(
+            self.metric_names[indices], self.values[indices], self.is_valid[indices],
+            self.message_codes[indices], self.messages, self.range_codes[indices], self.ranges,
+            self.severity_codes[indices]
+        )
+
+    def __len__(self):
+        return len(self.is_valid)
+
+    def __getitem__(self, i) -> ValidationResult:
+        value = self.values[i]
+        return ValidationResult(
+            is_valid=bool(self.is_valid[i]),
+            message=self.messages[self.message_codes[i]],
+            severity=SEVERITY_ORDER[self.severity_codes[i]],
+            metric_name=self.metric_names[i],
+            value=None if np.isnan(value) else float(value),
+            expected_range=self.ranges[self.range_codes[i]]
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def message_column(self) -> pd.Categorical:
+        """Messages as a categorical column: the interned table plus one code per row"""
+        return pd.Categorical.from_codes(self.message_codes, categories=self.messages)
+
+    def severity_column(self) -> pd.Categorical:
+        """Severity values as a categorical column"""
+        return pd.Categorical.from_codes(self.severity_codes, categories=[s.value for s in SEVERITY_ORDER])
+
+    def expected_min_column(self) -> np.ndarray:
+        """Lower bounds per row (None when there is no expected range)"""
+        return np.array([r[0] if r else None for r in self.ranges], dtype=object)[self.range_codes]
+
+    def expected_max_column(self) -> np.ndarray:
+        """Upper bounds per row (None when there is no expected range)"""
+        return np.array([r[1] if r else None for r in self.ranges], dtype=object)[self.range_codes]
+
 class BaseValidator(ABC):
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -1,7 +1,14 @@
 from typing import Dict, List, Optional, Union, Callable
-from dataclasses import dataclass, field
+import hashlib
+import sys
+from pathlib import Path
+import numpy as np
+from dataclasses import dataclass, field, fields
 from enum import Enum
 
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / 'data_processing'))
+from code_fingerprint import code_fingerprint
+
 class ValidationType(Enum):
     NON_NEGATIVE = "non_negative"
     NON_ZERO = "non_zero"
@@ -16,6 +23,7 @@ class ValidationType(Enum):
     ARRAY = "array"
     CASHFLOW = "cashflow"
     CUSTOM_VALIDATION = "custom_validation"
+    CROSS_METRIC = "cross_metric"
 
 @dataclass
 class MetricRule:
@@ -28,6 +36,27 @@ class MetricRule:
     dependencies: List[str] = field(default_factory=list)
     custom_validation: Optional[Callable] = None
 
+@dataclass(frozen=True)
+class CompiledRule:
+    """A rule with its group and its range bounds resolved ahead of validation"""
+    rule: MetricRule
+    group: str
+    min_value: Optional[float]
+    max_value: Optional[float]
+    dynamic_range: bool = False
+
+    def resolve_range(self, value) -> tuple:
+        """Return the (min, max) bounds for a value; only dynamic ranges call the rule's range functions"""
+        if not self.dynamic_range:
+            return self.min_value, self.max_value
+        min_value = self.rule.min_value
+        max_value = self.rule.max_value
+        if callable(min_value):
+            min_value, _ = min_value(value)
+        if callable(max_value):
+            _, max_value = max_value(value)
+        return min_value, max_value
+
 class MetricRules:
     def __init__(self):
         # Define dynamic range functions
@@ -59,27 +88,30 @@ class MetricRules:
             """Value should be negative (less than or equal to 0)"""
             return (None, 0)
 
-        # Custom validation function to check if two metrics are equal
-        # This function would need access to the values of both metrics.
-        # The current MetricRule custom_validation signature only takes one value.
-        # You might need to adjust the validation framework to pass a dictionary
-        # of all metric values being validated to the custom_validation function,
-        # or define a custom validation logic outside of the MetricRule definition
-        # that iterates through these pairs and performs the comparison.
+        # Range functions that do not depend on the value, resolved once when the index is compiled
+        self.constant_range_functions = {
+            get_growth_rate_range, get_ratio_range, get_probability_range, get_weekday_range,
+            get_percentage_range, get_cashflow_range, get_negative_range
+        }
+
+        # Cross-metric checks. A CROSS_METRIC rule lists the metrics it compares in
+        # dependencies (the checked metric first); its custom_validation receives
+        # that metric's values for all companies and a dict of the other metrics'
+        # values, and returns a boolean mask. Values of the same date range are compared.
+        def check_equality(value: np.ndarray, dependent_values: Dict[str, np.ndarray]) -> np.ndarray:
+            """Checks if the value is equal to the value of the dependent metric."""
+            dependent_value = next(iter(dependent_values.values()))
+            return np.isclose(value, dependent_value, rtol=1e-9, atol=1e-9)
+
+        def check_annualized_monthly(value: np.ndarray, dependent_values: Dict[str, np.ndarray]) -> np.ndarray:
+            """Checks if the annualized value is about 12 times the monthly average (within 5%)."""
+            dependent_value = next(iter(dependent_values.values()))
+            return np.isclose(value, 12 * dependent_value, rtol=0.05, atol=1e-9)
 
-        # For demonstration, let's assume a validation system that can pass
-        # dependent metric values to a custom validator keyed by dependencies.
-        # The custom validation function would then look up the dependent metric's value.
-        def check_equality(value: float, dependent_values: Dict[str, float]) -> bool:
-            """Checks if the value is equal to the value of the specified dependent metric."""
-            # Assuming the dependency is the second metric in the pair
-            dependent_metric_name = list(dependent_values.keys())[0]
-            dependent_value = dependent_values.get(dependent_metric_name)
-            if dependent_value is None:
-                # Handle case where dependent metric value is not available
-                print(f"Warning: Dependent metric '{dependent_metric_name}' value not available for comparison.")
-                return False # Or True, depending on desired behavior when data is missing
-            return abs(value - dependent_value) < 1e-9 # Use a small tolerance for float comparison
+        def check_not_greater(value: np.ndarray, dependent_values: Dict[str, np.ndarray]) -> np.ndarray:
+            """Checks if the value does not exceed the value of the dependent metric."""
+            dependent_value = next(iter(dependent_values.values()))
+            return value <= dependent_value
 
         self.rules: Dict[str, List[MetricRule]] = {
             "balance": [
@@ -102,7 +134,14 @@ class MetricRules:
                 MetricRule("weekday_with_highest_avg", ValidationType.WEEKDAY, get_weekday_range,
                           None, "Weekday should be between 0 (Monday) and 6 (Sunday)"),
                 MetricRule("weekday_with_lowest_avg", ValidationType.WEEKDAY, get_weekday_range,
-                          None, "Weekday should be between 0 (Monday) and 6 (Sunday)")
+                          None, "Weekday should be between 0 (Monday) and 6 (Sunday)"),
+                MetricRule(
+                    metric_name="balance_minimum_not_above_balance_average",
+                    validation_type=ValidationType.CROSS_METRIC,
+                    description="Minimum balance should not exceed average balance",
+                    dependencies=["balance_minimum", "balance_average"],
+                    custom_validation=check_not_greater
+                )
             ],
             "data_quality": [
                 MetricRule("data_volume", ValidationType.NON_ZERO, 1, None,
@@ -215,46 +254,54 @@ class MetricRules:
                           None, "Average daily net operating cashflow can be positive or negative"),
                 MetricRule(
                     metric_name="revenue_profit_and_loss_equals_revenue",
-                    validation_type=ValidationType.CUSTOM_VALIDATION,
+                    validation_type=ValidationType.CROSS_METRIC,
                     description="Revenue from P&L view should equal standard Revenue",
-                    dependencies=["revenue"],
+                    dependencies=["revenue_profit_and_loss", "revenue"],
                     custom_validation=check_equality
                 ),
                 MetricRule(
                     metric_name="annualized_revenue_profit_and_loss_equals_annualized_revenue",
-                    validation_type=ValidationType.CUSTOM_VALIDATION,
+                    validation_type=ValidationType.CROSS_METRIC,
                     description="Annualized Revenue from P&L view should equal standard Annualized Revenue",
-                    dependencies=["annualized_revenue"],
+                    dependencies=["annualized_revenue_profit_and_loss", "annualized_revenue"],
                     custom_validation=check_equality
                 ),
                 MetricRule(
                     metric_name="cogs_profit_and_loss_equals_cogs",
-                    validation_type=ValidationType.CUSTOM_VALIDATION,
+                    validation_type=ValidationType.CROSS_METRIC,
                     description="COGS from P&L view should equal standard COGS",
-                    dependencies=["cogs"],
+                    dependencies=["cogs_profit_and_loss", "cogs"],
                     custom_validation=check_equality
                 ),
                 MetricRule(
                     metric_name="opex_profit_and_loss_equals_opex",
-                    validation_type=ValidationType.CUSTOM_VALIDATION,
+                    validation_type=ValidationType.CROSS_METRIC,
                     description="Opex from P&L view should equal standard Opex",
-                    dependencies=["opex"],
+                    dependencies=["opex_profit_and_loss", "opex"],
                     custom_validation=check_equality
                 ),
                 MetricRule(
                     metric_name="gross_operating_cashflow_profit_and_loss_equals_gross_operating_cashflow",
-                    validation_type=ValidationType.CUSTOM_VALIDATION,
+                    validation_type=ValidationType.CROSS_METRIC,
                     description="Gross Operating Cashflow from P&L view should equal standard Gross Operating Cashflow",
-                    dependencies=["gross_operating_cashflow"],
+                    dependencies=["gross_operating_cashflow_profit_and_loss", "gross_operating_cashflow"],
                     custom_validation=check_equality
                 ),
                 MetricRule(
                     metric_name="net_operating_cashflow_profit_and_loss_equals_net_operating_cashflow",
-                    validation_type=ValidationType.CUSTOM_VALIDATION,
+                    validation_type=ValidationType.CROSS_METRIC,
                     description="Net Operating Cashflow from P&L view should equal standard Net Operating Cashflow",
-                    dependencies=["net_operating_cashflow"],
+                    dependencies=["net_operating_cashflow_profit_and_loss", "net_operating_cashflow"],
                     custom_validation=check_equality
                 ),
+                MetricRule(
+                    metric_name="annualized_revenue_equals_12x_revenue_monthly_average",
+                    validation_type=ValidationType.CROSS_METRIC,
+                    description="Annualized Revenue should be about 12 times the average monthly Revenue",
+                    severity="warning",
+                    dependencies=["annualized_revenue", "revenue_monthly_average"],
+                    custom_validation=check_annualized_monthly
+                ),
             ],
             "risk_flag": [
                 MetricRule("deposit_days", ValidationType.NON_NEGATIVE, 0, None,
@@ -277,14 +324,65 @@ class MetricRules:
                           "Count of negative balance days by account should be non-negative")
             ]
         }
+        self.rebuild_index()
+
+    def compile_rule(self, group_name: str, rule: MetricRule) -> CompiledRule:
+        """Resolve a rule's bounds; ranges from value-dependent functions stay dynamic"""
+        bounds = (rule.min_value, rule.max_value)
+        if any(callable(bound) and bound not in self.constant_range_functions for bound in bounds):
+            return CompiledRule(rule, group_name, None, None, dynamic_range=True)
+        min_value, max_value = bounds
+        if callable(min_value):
+            min_value, _ = min_value(None)
+        if callable(max_value):
+            _, max_value = max_value(None)
+        return CompiledRule(rule, group_name, min_value, max_value)
+
+    def rebuild_index(self) -> None:
+        """Compile the metric name -> rule index; call it after editing self.rules directly"""
+        index = {}
+        cross_metric_rules = []
+        for group_name, group_rules in self.rules.items():
+            for rule in group_rules:
+                # Cross-metric rules compare several metrics, so they are not looked up by metric name
+                if rule.validation_type == ValidationType.CROSS_METRIC:
+                    cross_metric_rules.append(CompiledRule(rule, group_name, None, None))
+                # The first rule defined for a metric wins, as in a scan over the groups
+                elif rule.metric_name not in index:
+                    index[rule.metric_name] = self.compile_rule(group_name, rule)
+        self.index: Dict[str, CompiledRule] = index
+        self.cross_metric_rules: List[CompiledRule] = cross_metric_rules
+
+    def get_version(self) -> str:
+        """Content hash of all rules, including the functions they use; it changes whenever any rule changes"""
+        digest = hashlib.blake2b(digest_size=16)
+        for group_name, group_rules in self.rules.items():
+            for rule in group_rules:
+                fingerprint = [group_name] + [code_fingerprint(getattr(rule, f.name)) for f in fields(rule)]
+                digest.update(repr(fingerprint).encode())
+        return digest.hexdigest()
+
+    def get_compiled_rule(self, metric_name: str) -> Optional[CompiledRule]:
+        """Get the compiled rule (rule, group and resolved bounds) for a metric"""
+        return self.index.get(metric_name)
 
     def get_rule_for_metric(self, metric_name: str) -> Optional[MetricRule]:
         """Get validation rule for a specific metric"""
-        for group_rules in self.rules.values():
-            for rule in group_rules:
-                if rule.metric_name == metric_name:
-                    return rule
-        return None
+        compiled = self.index.get(metric_name)
+        return compiled.rule if compiled else None
+
+    def get_group_for_metric(self, metric_name: str) -> Optional[str]:
+        """Get the group a metric's rule belongs to"""
+        compiled = self.index.get(metric_name)
+        return compiled.group if compiled else None
+
+    def get_metric_names(self) -> List[str]:
+        """Get the names of all metrics that have a rule"""
+        return list(self.index)
+
+    def get_cross_metric_rules(self) -> List[CompiledRule]:
+        """Get the rules that compare several metrics of the same company"""
+        return self.cross_metric_rules
 
     def get_rules_for_group(self, group_name: str) -> List[MetricRule]:
         """Get all validation rules for a specific metric group"""
@@ -295,6 +393,7 @@ class MetricRules:
         if group_name not in self.rules:
             self.rules[group_name] = []
         self.rules[group_name].append(rule)
+        self.rebuild_index()
 
     def update_rule(self, metric_name: str, updated_rule: MetricRule) -> bool:
         """Update an existing validation rule"""
@@ -302,6 +401,7 @@ class MetricRules:
             for i, rule in enumerate(rules):
                 if rule.metric_name == metric_name:
                     self.rules[group_name][i] = updated_rule
+                    self.rebuild_index()
                     return True
         return False
 
@@ -311,5 +411,6 @@ class MetricRules:
             for i, rule in enumerate(rules):
                 if rule.metric_name == metric_name:
                     del self.rules[group_name][i]
+                    self.rebuild_index()
                     return True
         return False 
\ No newline at end of file
@@ -1,7 +1,11 @@
 from typing import Any, Dict, List, Optional, Union, Callable
-from .base_validator import BaseValidator, ValidationResult, ValidationSeverity
+from .base_validator import (BaseValidator, ValidationResult, ValidationResultStore, ValidationSeverity,
+                             SEVERITY_CODES)
 from .metric_rules import MetricRules, ValidationType, MetricRule
 import logging
+from collections import defaultdict
+import numpy as np
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -36,10 +40,10 @@ class MetricValidator(BaseValidator):
     
     def validate(self, value: Any, metric_name: str) -> ValidationResult:
         """Validate a single metric value against its rules"""
-        # Get rule for this metric
-        rule = self.metric_rules.get_rule_for_metric(metric_name)
+        # Get the compiled rule for this metric
+        compiled = self.metric_rules.get_compiled_rule(metric_name)
         
-        if not rule:
+        if not compiled:
             logger.warning(f"No validation rule found for metric: {metric_name}")
             return ValidationResult(
                 is_valid=True,
@@ -61,15 +65,9 @@ class MetricValidator(BaseValidator):
                 expected_range=None
             )
         
-        # Get validation range from the rule
-        min_value = rule.min_value
-        max_value = rule.max_value
-        
-        # Handle callable range functions
-        if callable(min_value):
-            min_value, _ = min_value(value)
-        if callable(max_value):
-            _, max_value = max_value(value)
+        # Get validation range from the rule (resolved at compile time unless it depends on the value)
+        rule = compiled.rule
+        min_value, max_value = compiled.resolve_range(value)
         
         # Perform validation based on validation type
         is_valid = True
@@ -128,6 +126,177 @@ class MetricValidator(BaseValidator):
             expected_range=(min_value, max_value)
         )
     
+    def get_rule_severity(self, rule: MetricRule) -> Optional[ValidationSeverity]:
+        """Severity configured on a rule, or None when it depends on the validation outcome"""
+        if not (hasattr(rule, 'severity') and rule.severity):
+            return None
+        try:
+            return ValidationSeverity[rule.severity.upper()]
+        except (KeyError, AttributeError):
+            return ValidationSeverity.ERROR
+
+    def get_range_mask(self, validation_type: str, values: np.ndarray, min_value, max_value) -> tuple:
+        """Return the validity mask and failure message template for one validation type"""
+        if validation_type == "non_negative":
+            return values >= 0, "{metric_name} should be non-negative"
+        if validation_type == "non_zero":
+            return values != 0, "{metric_name} should be non-zero"
+        if validation_type == "probability":
+            return (values >= 0) & (values <= 1), "{metric_name} should be between 0 and 1"
+        if validation_type == "weekday":
+            return (values >= 0) & (values <= 6), "{metric_name} should be between 0 (Monday) and 6 (Sunday)"
+        if validation_type == "percentage":
+            return (values >= 0) & (values <= 100), "{metric_name} should be between 0 and 100"
+
+        is_valid = np.ones(len(values), dtype=bool)
+        if min_value is not None:
+            is_valid &= values >= min_value
+        if max_value is not None:
+            is_valid &= values <= max_value
+        if validation_type == "ratio":
+            return is_valid, "{metric_name} should be between {min_value} and {max_value}"
+        # Cashflow and all other types are plain range checks
+        return is_valid, "{metric_name} should be within range {min_value} to {max_value}"
+
+    def _validate_array_per_value(self, values: np.ndarray, metric_name: str) -> ValidationResultStore:
+        """Validate values one at a time, for rules whose outcome cannot be computed on arrays"""
+        return ValidationResultStore.from_results(
+            [self.validate(None if np.isnan(value) else float(value), metric_name) for value in values])
+
+    def _uniform_store(self, values: np.ndarray, metric_name: str, is_valid: np.ndarray, message_codes: np.ndarray,
+                       messages: List[str], range_codes: np.ndarray, ranges: List[Optional[tuple]],
+                       severity_codes: np.ndarray) -> ValidationResultStore:
+        """Build the store of one metric's values from its codes and tables"""
+        return ValidationResultStore(
+            metric_names=np.full(len(values), metric_name, dtype=object),
+            values=values,
+            is_valid=is_valid,
+            message_codes=message_codes.astype(np.int32),
+            messages=messages,
+            range_codes=range_codes.astype(np.int16),
+            ranges=ranges,
+            severity_codes=severity_codes.astype(np.int8)
+        )
+
+    def validate_array(self, values: np.ndarray, metric_name: str) -> ValidationResultStore:
+        """Validate an array of values of one metric (NaN marks a missing value) with array operations.
+
+        Returns a ValidationResultStore whose rows match calling validate() on
+        every value.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n_values = len(values)
+        compiled = self.metric_rules.get_compiled_rule(metric_name)
+
+        if not compiled:
+            logger.warning(f"No validation rule found for metric: {metric_name} ({n_values} values)")
+            zeros = np.zeros(n_values, dtype=np.int8)
+            return self._uniform_store(
+                values, metric_name, np.ones(n_values, dtype=bool),
+                zeros, [f"No validation rule defined for {metric_name}"], zeros, [None],
+                np.full(n_values, SEVERITY_CODES[ValidationSeverity.INFO], dtype=np.int8))
+
+        rule = compiled.rule
+        if compiled.dynamic_range or rule.custom_validation:
+            return self._validate_array_per_value(values, metric_name)
+
+        missing = np.isnan(values)
+        min_value, max_value = compiled.min_value, compiled.max_value
+        valid_present, failure_message = self.get_range_mask(
+            rule.validation_type.value, values[~missing], min_value, max_value)
+
+        is_valid = np.zeros(n_values, dtype=bool)
+        is_valid[~missing] = valid_present
+        # Message codes: 0 passed, 1 failed, 2 missing
+        messages = [
+            f"Validation passed for {metric_name}",
+            failure_message.format(metric_name=metric_name, min_value=min_value, max_value=max_value),
+            f"Missing value for {metric_name}"
+        ]
+        message_codes = np.where(is_valid, 0, 1)
+        message_codes[missing] = 2
+        # Missing values have no expected range
+        range_codes = missing.astype(np.int16)
+
+        rule_severity = self.get_rule_severity(rule)
+        if rule_severity is None:
+            severity_codes = np.where(is_valid, SEVERITY_CODES[ValidationSeverity.INFO],
+                                      SEVERITY_CODES[ValidationSeverity.ERROR])
+        else:
+            severity_codes = np.full(n_values, SEVERITY_CODES[rule_severity])
+        severity_codes[missing] = SEVERITY_CODES[ValidationSeverity.WARNING]
+
+        return self._uniform_store(values, metric_name, is_valid, message_codes, messages,
+                                   range_codes, [(min_value, max_value), None], severity_codes)
+
+    def validate_columns(self, metric_names: np.ndarray, values: np.ndarray) -> ValidationResultStore:
+        """Validate rows of (metric name, value) by grouping them per metric and validating each group as an array"""
+        values = np.asarray(values, dtype=np.float64)
+        codes, uniques = pd.factorize(np.asarray(metric_names, dtype=object), use_na_sentinel=True)
+        uniques = list(uniques)
+        if (codes < 0).any():
+            # Rows without a metric name are validated under a NaN name, like validate() would
+            codes = np.where(codes < 0, len(uniques), codes)
+            uniques.append(np.nan)
+
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        stores = [
+            self.validate_array(values[order[bounds[code]:bounds[code + 1]]], metric_name)
+            for code, metric_name in enumerate(uniques)
+        ]
+        # The per-metric stores follow the sorted order; put the rows back in input order
+        inverse = np.empty(len(order), dtype=np.int64)
+        inverse[order] = np.arange(len(order))
+        return ValidationResultStore.concat(stores).take(inverse)
+
+    def validate_batch(self, values: List[Any], metric_name: str) -> ValidationResultStore:
+        """Validate a batch of values for a metric with array operations.
+
+        The result is a sequence of ValidationResult objects built on access.
+        """
+        return self.validate_array(
+            np.array([np.nan if value is None else value for value in values], dtype=np.float64), metric_name)
+
+    def validate_dependencies(self, matrix: np.ndarray, columns: List[tuple]) -> List[Dict[str, Any]]:
+        """Evaluate the cross-metric rules on a company x (metric_name, date_range) value matrix.
+
+        Each rule is checked once per date range shared by all of its metrics,
+        as one array operation over all companies. Companies missing any of the
+        values are not checked. Returns one entry per rule and date range with
+        the row positions of the companies that violate it.
+        """
+        column_index = {column: i for i, column in enumerate(columns)}
+        date_ranges_by_metric = defaultdict(list)
+        for metric_name, date_range in columns:
+            date_ranges_by_metric[metric_name].append(date_range)
+
+        results = []
+        for compiled in self.metric_rules.get_cross_metric_rules():
+            rule = compiled.rule
+            metric_name, dependent_names = rule.dependencies[0], rule.dependencies[1:]
+            severity = self.get_rule_severity(rule) or ValidationSeverity.ERROR
+            for date_range in date_ranges_by_metric.get(metric_name, []):
+                keys = [(name, date_range) for name in rule.dependencies]
+                if any(key not in column_index for key in keys):
+                    continue
+                values = matrix[:, [column_index[key] for key in keys]]
+                checked = ~np.isnan(values).any(axis=1)
+                passed = rule.custom_validation(
+                    values[checked, 0],
+                    {name: values[checked, i + 1] for i, name in enumerate(dependent_names)})
+                results.append({
+                    'rule': rule.metric_name,
+                    'group': compiled.group,
+                    'description': rule.description,
+                    'severity': severity.value,
+                    'metrics': list(rule.dependencies),
+                    'date_range': date_range,
+                    'checked_count': int(np.count_nonzero(checked)),
+                    'failed_rows': np.flatnonzero(checked)[~np.asarray(passed, dtype=bool)]
+                })
+        return results
+
     def validate_metric_group(self, group_name: str, values: Dict[str, Any]) -> Dict[str, ValidationResult]:
         """Validate all metrics for a specific group"""
         results = {}
@@ -144,10 +313,7 @@ class MetricValidator(BaseValidator):
         results = {}
         
         # Get all metrics that should be validated based on the rules
-        all_expected_metrics = set()
-        for group_rules in self.metric_rules.rules.values():
-            for rule in group_rules:
-                all_expected_metrics.add(rule.metric_name)
+        all_expected_metrics = set(self.metric_rules.get_metric_names())
         
         # Validate provided metrics
         for metric_name, value in metrics.items():
@@ -177,9 +343,6 @@ class MetricValidator(BaseValidator):
     
     def get_missing_metrics(self, metrics: Dict[str, Any]) -> List[str]:
         """Return a list of metrics that are expected but missing from the input"""
-        all_expected_metrics = set()
-        for group_rules in self.metric_rules.rules.values():
-            for rule in group_rules:
-                all_expected_metrics.add(rule.metric_name)
+        all_expected_metrics = set(self.metric_rules.get_metric_names())
         
         return list(all_expected_metrics - set(metrics.keys())) 
\ No newline at end of file